@@ -0,0 +1,116 @@
+"""
+Chart builders for the CrossRisk Streamlit application.
+Centralizes Plotly figure construction so render settings are applied in one place.
+"""
+
+import pandas as pd
+from typing import Optional
+import plotly.graph_objects as go
+import plotly.io as pio
+
+try:
+    from plotly_resampler import FigureResampler
+except ImportError:  # plotly-resampler is optional; traces are then sent at full resolution
+    FigureResampler = None
+
+# Pie charts stop being readable (and get expensive to lay out) past this many slices
+MAX_PIE_SLICES = 100
+
+# Points per time-series trace sent to the browser when downsampling is available
+TS_MAX_POINTS = 1000
+
+# Shared styling for the builders below, registered once at import rather than
+# passed to every chart. Layered on the stock template so other pages keep plotly defaults.
+pio.templates['crossrisk'] = go.layout.Template(
+    layout=go.Layout(
+        height=400,
+        showlegend=False,
+        font=dict(size=12),
+        colorscale=dict(sequential='RdYlGn_r')
+    ),
+    data=dict(bar=[go.Bar(marker_colorscale='RdYlGn_r')])
+)
+CHART_TEMPLATE = 'plotly+crossrisk'
+
+def fast_bar(df: pd.DataFrame, **kwargs) -> go.Figure:
+    """
+    Build a bar chart.
+
+    Plotly has no WebGL bar trace, so bars are always SVG; routing every bar
+    chart through here keeps render settings in one place.
+
+    Args:
+        df: DataFrame with chart data
+        **kwargs: Arguments forwarded to plotly.express.bar
+
+    Returns:
+        Plotly figure object
+    """
+    import plotly.express as px
+    
+    kwargs.setdefault('template', CHART_TEMPLATE)
+    return px.bar(df, **kwargs)
+
+def fast_pie(df: pd.DataFrame, names: str, values: str, **kwargs) -> go.Figure:
+    """
+    Build a pie chart, falling back to a bar chart for high segment counts.
+
+    Args:
+        df: DataFrame with chart data
+        names: Column with slice labels
+        values: Column with slice sizes
+        **kwargs: Arguments forwarded to plotly.express.pie
+
+    Returns:
+        Plotly figure object
+    """
+    if len(df) > MAX_PIE_SLICES:
+        bar_kwargs = {k: v for k, v in kwargs.items() if k in ('title', 'color', 'color_discrete_map', 'labels', 'template')}
+        return fast_bar(df, x=names, y=values, **bar_kwargs)
+
+    import plotly.express as px
+    
+    kwargs.setdefault('template', CHART_TEMPLATE)
+    return px.pie(df, names=names, values=values, **kwargs)
+
+def ts_figure() -> go.Figure:
+    """
+    Create an empty figure for time-series traces.
+
+    With plotly-resampler installed this is a FigureResampler, which ships an
+    LTTB-downsampled view of each trace. It only re-samples on zoom through
+    its Dash callback, which Streamlit never runs, so zooming a chart in the
+    app magnifies the initial downsample rather than revealing more detail.
+
+    Returns:
+        Plotly figure object
+    """
+    if FigureResampler is None:
+        return go.Figure()
+    return FigureResampler(go.Figure(), default_n_shown_samples=TS_MAX_POINTS)
+
+def ts_line(df: pd.DataFrame, x: str, y: str, fig: Optional[go.Figure] = None,
+            **trace_kwargs) -> go.Figure:
+    """
+    Add a WebGL line trace for a time series, downsampled when supported.
+
+    Args:
+        df: DataFrame with chart data
+        x: Column with timestamps
+        y: Column with values
+        fig: Figure from ts_figure() to add the trace to; a new one is created if omitted
+        **trace_kwargs: Arguments forwarded to plotly.graph_objects.Scattergl
+
+    Returns:
+        Plotly figure object
+    """
+    if fig is None:
+        fig = ts_figure()
+
+    hf_x = pd.to_datetime(df[x])
+    if FigureResampler is not None and isinstance(fig, FigureResampler):
+        fig.add_trace(go.Scattergl(**trace_kwargs), hf_x=hf_x, hf_y=df[y])
+    else:
+        fig.add_trace(go.Scattergl(x=hf_x, y=df[y], **trace_kwargs))
+
+    return fig
@@ -6,635 +6,811 @@ Handles Snowflake connections and provides sample data when unavailable.
 import streamlit as st
 import pandas as pd
 import numpy as np
-from typing import Optional
+from typing import Any, Dict, Optional
+import functools
+import json
 import os
+import re
 
-# Sample data cache
-_sample_data_cache = {}
+from utils import scalar
 
+try:
+    from numba import njit
+except ImportError:  # numba is optional; sample scoring then runs as plain NumPy
+    njit = None
+
+# Offsets for sample timestamps, built once rather than per row
+_HOUR = pd.Timedelta(hours=1)
+_DAY = pd.Timedelta(days=1)
+
+# Shared result for empty and failed queries; read-only like the sample frames
+_EMPTY_DF = pd.DataFrame()
+
+# Low-cardinality sample columns are categorical with shared dtypes, so groupby
+# and isin work on integer codes. Categories are sorted to keep groupby output
+# in the same order as string keys; age bands sort naturally, so that dtype is
+# also ordered and supports range comparisons
+_REGIONS = ['Northeast', 'Southeast', 'Midwest', 'West']
+_AGE_GROUPS = ['18-24', '25-34', '35-44', '45-54', '55-64', '65+']
+_OCCUPATIONS = ['Technology', 'Healthcare', 'Finance', 'Education', 'Manufacturing', 'Retail']
+_REGION_DTYPE = pd.CategoricalDtype(sorted(_REGIONS))
+_AGE_GROUP_DTYPE = pd.CategoricalDtype(sorted(_AGE_GROUPS), ordered=True)
+_OCCUPATION_DTYPE = pd.CategoricalDtype(sorted(_OCCUPATIONS))
+_RISK_CATEGORY_DTYPE = pd.CategoricalDtype(sorted(['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']))
+_CRITICAL, _HIGH, _MEDIUM, _LOW = (
+    _RISK_CATEGORY_DTYPE.categories.get_loc(c) for c in ('CRITICAL', 'HIGH', 'MEDIUM', 'LOW')
+)
+# Category codes for the composite score bands, lowest band first
+_BAND_CODES = np.array([_LOW, _MEDIUM, _HIGH, _CRITICAL], dtype=np.int8)
+
+def _score_segments(bank_risk: np.ndarray, insurance_risk: np.ndarray):
+    """Composite risk scores and their RISK_CATEGORY codes"""
+    composite = (bank_risk * 0.6) + (insurance_risk * 0.4)
+    # digitize bins with >= on each threshold, matching the numba kernel below
+    codes = _BAND_CODES[np.digitize(composite, [25, 50, 75])]
+    return composite, codes
+
+if njit is not None:
+    # cache=True keeps the compiled kernel on disk so app restarts skip the JIT
+    @njit(cache=True)
+    def _score_segments(bank_risk, insurance_risk):
+        composite = (bank_risk * 0.6) + (insurance_risk * 0.4)
+        codes = np.empty(composite.size, np.int8)
+        for i in range(composite.size):
+            if composite[i] >= 75:
+                codes[i] = _CRITICAL
+            elif composite[i] >= 50:
+                codes[i] = _HIGH
+            elif composite[i] >= 25:
+                codes[i] = _MEDIUM
+            else:
+                codes[i] = _LOW
+        return composite, codes
+
+# Sample frames are built once per process by st.cache_resource and shared
+# read-only across sessions; they must not be modified in place. Frames derived
+# from them rely on pandas 3's copy-on-write to copy only when written
+@st.cache_resource(show_spinner=False)
 def get_sample_risk_data() -> pd.DataFrame:
     """Generate realistic sample risk data for offline mode"""
-    if 'risk_data' in _sample_data_cache:
-        return _sample_data_cache['risk_data'].copy()
-    
-    np.random.seed(42)
-    regions = ['Northeast', 'Southeast', 'Midwest', 'West']
-    age_groups = ['18-24', '25-34', '35-44', '45-54', '55-64', '65+']
-    occupations = ['Technology', 'Healthcare', 'Finance', 'Education', 'Manufacturing', 'Retail']
-    risk_categories = ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
-    
-    data = []
-    for region in regions:
-        for age_group in age_groups:
-            for occupation in occupations:
-                if np.random.random() > 0.6:  # Not all combinations exist
-                    record_count = np.random.randint(3, 25)
-                    bank_risk = np.random.uniform(15, 85)
-                    insurance_risk = np.random.uniform(15, 85)
-                    composite = (bank_risk * 0.6) + (insurance_risk * 0.4)
-                    
-                    if composite >= 75:
-                        category = 'CRITICAL'
-                    elif composite >= 50:
-                        category = 'HIGH'
-                    elif composite >= 25:
-                        category = 'MEDIUM'
-                    else:
-                        category = 'LOW'
-                    
-                    data.append({
-                        'ANALYSIS_ID': f'A{len(data)+1:04d}',
-                        'AGE_GROUP': age_group,
-                        'REGION': region,
-                        'OCCUPATION_CATEGORY': occupation,
-                        'RECORD_COUNT': record_count,
-                        'AVG_BANK_RISK_SCORE': round(bank_risk, 2),
-                        'AVG_INSURANCE_RISK_SCORE': round(insurance_risk, 2),
-                        'COMPOSITE_RISK_SCORE': round(composite, 2),
-                        'RISK_CATEGORY': category,
-                        'FRAUD_CORRELATION_SCORE': round(np.random.uniform(0.05, 0.85), 2)
-                    })
+    rng = np.random.default_rng(42)
+    
+    # Draw every column in one call instead of once per segment
+    regions, age_groups, occupations = (
+        grid.ravel() for grid in np.meshgrid(_REGIONS, _AGE_GROUPS, _OCCUPATIONS, indexing='ij')
+    )
+    exists = rng.random(regions.size) > 0.6  # Not all combinations exist
+    regions, age_groups, occupations = regions[exists], age_groups[exists], occupations[exists]
+    n = regions.size
+    
+    record_count = rng.integers(3, 25, n, dtype=np.int16)
+    bank_risk = rng.uniform(15, 85, n)
+    insurance_risk = rng.uniform(15, 85, n)
+    fraud_correlation = rng.uniform(0.05, 0.85, n)
+    composite, category_codes = _score_segments(bank_risk, insurance_risk)
+    
+    data = {
+        'ANALYSIS_ID': np.char.add('A', np.char.zfill(np.arange(1, n + 1).astype(str), 4)),
+        'AGE_GROUP': pd.Categorical(age_groups, dtype=_AGE_GROUP_DTYPE),
+        'REGION': pd.Categorical(regions, dtype=_REGION_DTYPE),
+        'OCCUPATION_CATEGORY': pd.Categorical(occupations, dtype=_OCCUPATION_DTYPE),
+        'RECORD_COUNT': record_count,
+        'AVG_BANK_RISK_SCORE': bank_risk.round(2).astype(np.float32),
+        'AVG_INSURANCE_RISK_SCORE': insurance_risk.round(2).astype(np.float32),
+        'COMPOSITE_RISK_SCORE': composite.round(2).astype(np.float32),
+        'RISK_CATEGORY': pd.Categorical.from_codes(category_codes, dtype=_RISK_CATEGORY_DTYPE),
+        'FRAUD_CORRELATION_SCORE': fraud_correlation.round(2).astype(np.float32)
+    }
     
     df = pd.DataFrame(data)
-    _sample_data_cache['risk_data'] = df
-    return df.copy()
+    return df
 
+@st.cache_resource(show_spinner=False)
 def get_sample_questions() -> pd.DataFrame:
     """Generate sample approved questions data"""
-    if 'questions' in _sample_data_cache:
-        return _sample_data_cache['questions'].copy()
-    
-    questions = pd.DataFrame([
-        {
-            'QUESTION_ID': 'Q001',
-            'QUESTION_TEXT': 'What is the overall risk distribution across customer segments?',
-            'CATEGORY': 'Risk Overview',
-            'AI_SUMMARY': 'Analysis shows balanced risk distribution with 45% low-medium risk and 35% high-critical risk segments.',
-            'LAST_REFRESHED': pd.Timestamp.now()
-        },
-        {
-            'QUESTION_ID': 'Q002',
-            'QUESTION_TEXT': 'Which age groups show the highest risk scores?',
-            'CATEGORY': 'Age Analysis',
-            'AI_SUMMARY': 'Age groups 45-54 and 55-64 demonstrate elevated risk profiles with average scores above 60.',
-            'LAST_REFRESHED': pd.Timestamp.now()
-        },
-        {
-            'QUESTION_ID': 'Q003',
-            'QUESTION_TEXT': 'What are the regional risk hotspots?',
-            'CATEGORY': 'Regional Analysis',
-            'AI_SUMMARY': 'Southeast and Midwest regions show higher average risk scores compared to coastal regions.',
-            'LAST_REFRESHED': pd.Timestamp.now()
-        }
-    ])
-    
-    _sample_data_cache['questions'] = questions
-    return questions.copy()
+    now = pd.Timestamp.now()
+    questions = pd.DataFrame({
+        'QUESTION_ID': ['Q001', 'Q002', 'Q003'],
+        'QUESTION_TEXT': [
+            'What is the overall risk distribution across customer segments?',
+            'Which age groups show the highest risk scores?',
+            'What are the regional risk hotspots?'
+        ],
+        'CATEGORY': ['Risk Overview', 'Age Analysis', 'Regional Analysis'],
+        'AI_SUMMARY': [
+            'Analysis shows balanced risk distribution with 45% low-medium risk and 35% high-critical risk segments.',
+            'Age groups 45-54 and 55-64 demonstrate elevated risk profiles with average scores above 60.',
+            'Southeast and Midwest regions show higher average risk scores compared to coastal regions.'
+        ],
+        'LAST_REFRESHED': now
+    })
+    
+    return questions
 
+@st.cache_resource(show_spinner=False)
 def get_sample_fraud_signals() -> pd.DataFrame:
     """Generate sample fraud detection data"""
-    if 'fraud' in _sample_data_cache:
-        return _sample_data_cache['fraud'].copy()
-    
-    fraud_data = pd.DataFrame([
-        {
-            'SIGNAL_ID': 'FS001',
-            'AGE_GROUP': '35-44',
-            'REGION': 'Midwest',
-            'PATTERN_DESCRIPTION': 'Elevated transaction velocity with simultaneous claim activity',
-            'AFFECTED_CUSTOMER_COUNT': 12,
-            'CONFIDENCE_SCORE': 0.87,
-            'DETECTED_AT': pd.Timestamp.now() - pd.Timedelta(days=5)
-        },
-        {
-            'SIGNAL_ID': 'FS002',
-            'AGE_GROUP': '45-54',
-            'REGION': 'Southeast',
-            'PATTERN_DESCRIPTION': 'Unusual claim frequency pattern across insurance products',
-            'AFFECTED_CUSTOMER_COUNT': 8,
-            'CONFIDENCE_SCORE': 0.72,
-            'DETECTED_AT': pd.Timestamp.now() - pd.Timedelta(days=12)
-        }
-    ])
-    
-    _sample_data_cache['fraud'] = fraud_data
-    return fraud_data.copy()
+    now = pd.Timestamp.now()
+    fraud_data = pd.DataFrame({
+        'SIGNAL_ID': ['FS001', 'FS002'],
+        'AGE_GROUP': pd.Categorical(['35-44', '45-54'], dtype=_AGE_GROUP_DTYPE),
+        'REGION': pd.Categorical(['Midwest', 'Southeast'], dtype=_REGION_DTYPE),
+        'PATTERN_DESCRIPTION': [
+            'Elevated transaction velocity with simultaneous claim activity',
+            'Unusual claim frequency pattern across insurance products'
+        ],
+        'AFFECTED_CUSTOMER_COUNT': [12, 8],
+        'CONFIDENCE_SCORE': [0.87, 0.72],
+        'DETECTED_AT': [now - 5 * _DAY, now - 12 * _DAY]
+    })
+    
+    return fraud_data
 
+@st.cache_resource(show_spinner=False)
 def get_sample_compliance_log() -> pd.DataFrame:
     """Generate sample compliance log data"""
-    if 'compliance' in _sample_data_cache:
-        return _sample_data_cache['compliance'].copy()
-    
-    compliance = pd.DataFrame([
-        {
-            'COMPLIANCE_ID': 'C001',
-            'CHECK_TYPE': 'K_ANONYMITY',
-            'TABLE_NAME': 'risk_join_aggregated',
-            'CHECK_RESULT': 'PASSED',
-            'DETAILS': 'All segments meet k>=3 requirement',
-            'CHECKED_AT': pd.Timestamp.now() - pd.Timedelta(hours=2)
-        },
-        {
-            'COMPLIANCE_ID': 'C002',
-            'CHECK_TYPE': 'DATA_QUALITY',
-            'TABLE_NAME': 'bank_customer_risk_summary',
-            'CHECK_RESULT': 'PASSED',
-            'DETAILS': 'No data quality issues detected',
-            'CHECKED_AT': pd.Timestamp.now() - pd.Timedelta(hours=4)
-        },
-        {
-            'COMPLIANCE_ID': 'C003',
-            'CHECK_TYPE': 'MASKING',
-            'TABLE_NAME': 'insurance_claim_risk_summary',
-            'CHECK_RESULT': 'PASSED',
-            'DETAILS': 'All masking policies are active',
-            'CHECKED_AT': pd.Timestamp.now() - pd.Timedelta(hours=6)
-        }
-    ])
-    
-    _sample_data_cache['compliance'] = compliance
-    return compliance.copy()
+    now = pd.Timestamp.now()
+    compliance = pd.DataFrame({
+        'COMPLIANCE_ID': ['C001', 'C002', 'C003'],
+        'CHECK_TYPE': ['K_ANONYMITY', 'DATA_QUALITY', 'MASKING'],
+        'TABLE_NAME': ['risk_join_aggregated', 'bank_customer_risk_summary', 'insurance_claim_risk_summary'],
+        'CHECK_RESULT': ['PASSED', 'PASSED', 'PASSED'],
+        'DETAILS': [
+            'All segments meet k>=3 requirement',
+            'No data quality issues detected',
+            'All masking policies are active'
+        ],
+        'CHECKED_AT': [now - 2 * _HOUR, now - 4 * _HOUR, now - 6 * _HOUR]
+    })
+    
+    return compliance
+
+def _draw_categories(rng: np.random.Generator, dtype: pd.CategoricalDtype, n: int) -> pd.Categorical:
+    """Draw n values uniformly from a categorical dtype's categories"""
+    return pd.Categorical.from_codes(rng.integers(0, len(dtype.categories), n), dtype=dtype)
+
+def _customer_ids(n: int) -> np.ndarray:
+    """Build CUST_00001-style customer IDs"""
+    return np.char.add('CUST_', np.char.zfill(np.arange(1, n + 1).astype(str), 5))
 
+@st.cache_resource(show_spinner=False)
 def get_sample_bank_data() -> pd.DataFrame:
     """Generate sample bank customer data"""
-    if 'bank_raw' in _sample_data_cache:
-        return _sample_data_cache['bank_raw'].copy()
-    
-    np.random.seed(42)
+    rng = np.random.default_rng(42)
     n_records = 100
     
-    data = []
-    for i in range(n_records):
-        data.append({
-            'CUSTOMER_ID': f'CUST_{i+1:05d}',
-            'AGE_GROUP': np.random.choice(['18-24', '25-34', '35-44', '45-54', '55-64', '65+']),
-            'REGION': np.random.choice(['Northeast', 'Southeast', 'Midwest', 'West']),
-            'RISK_SCORE': round(np.random.uniform(15, 85), 2),
-            'FRAUD_FLAG_HISTORY': np.random.randint(0, 3)
-        })
-    
-    df = pd.DataFrame(data)
-    _sample_data_cache['bank_raw'] = df
-    return df.copy()
+    df = pd.DataFrame({
+        'CUSTOMER_ID': _customer_ids(n_records),
+        'AGE_GROUP': _draw_categories(rng, _AGE_GROUP_DTYPE, n_records),
+        'REGION': _draw_categories(rng, _REGION_DTYPE, n_records),
+        'RISK_SCORE': rng.uniform(15, 85, n_records).round(2),
+        'FRAUD_FLAG_HISTORY': rng.integers(0, 3, n_records, dtype=np.int8)
+    })
+    return df
 
+@st.cache_resource(show_spinner=False)
 def get_sample_insurance_data() -> pd.DataFrame:
     """Generate sample insurance claim data"""
-    if 'insurance_raw' in _sample_data_cache:
-        return _sample_data_cache['insurance_raw'].copy()
-    
-    np.random.seed(43)
+    rng = np.random.default_rng(43)
     n_records = 100
     
-    data = []
-    for i in range(n_records):
-        data.append({
-            'CUSTOMER_ID': f'CUST_{i+1:05d}',
-            'AGE_GROUP': np.random.choice(['18-24', '25-34', '35-44', '45-54', '55-64', '65+']),
-            'REGION': np.random.choice(['Northeast', 'Southeast', 'Midwest', 'West']),
-            'RISK_SCORE': round(np.random.uniform(15, 85), 2),
-            'SUSPICIOUS_CLAIM_FLAGS': np.random.randint(0, 3)
-        })
-    
-    df = pd.DataFrame(data)
-    _sample_data_cache['insurance_raw'] = df
-    return df.copy()
+    df = pd.DataFrame({
+        'CUSTOMER_ID': _customer_ids(n_records),
+        'AGE_GROUP': _draw_categories(rng, _AGE_GROUP_DTYPE, n_records),
+        'REGION': _draw_categories(rng, _REGION_DTYPE, n_records),
+        'RISK_SCORE': rng.uniform(15, 85, n_records).round(2),
+        'SUSPICIOUS_CLAIM_FLAGS': rng.integers(0, 3, n_records, dtype=np.int8)
+    })
+    return df
 
+@st.cache_resource(show_spinner=False)
 def get_sample_correlation_data() -> pd.DataFrame:
     """Generate sample correlation data for bank and insurance"""
-    if 'correlation' in _sample_data_cache:
-        return _sample_data_cache['correlation'].copy()
-    
-    np.random.seed(44)
+    rng = np.random.default_rng(44)
     n_records = 80
     
-    data = []
-    for i in range(n_records):
-        age_group = np.random.choice(['18-24', '25-34', '35-44', '45-54', '55-64', '65+'])
-        region = np.random.choice(['Northeast', 'Southeast', 'Midwest', 'West'])
-        data.append({
-            'AGE_GROUP': age_group,
-            'REGION': region,
-            'BANK_RISK': round(np.random.uniform(20, 80), 2),
-            'INSURANCE_RISK': round(np.random.uniform(20, 80), 2),
-            'FRAUD_FLAG_HISTORY': np.random.randint(0, 2),
-            'SUSPICIOUS_CLAIM_FLAGS': np.random.randint(0, 2)
-        })
-    
-    df = pd.DataFrame(data)
-    _sample_data_cache['correlation'] = df
-    return df.copy()
+    df = pd.DataFrame({
+        'AGE_GROUP': _draw_categories(rng, _AGE_GROUP_DTYPE, n_records),
+        'REGION': _draw_categories(rng, _REGION_DTYPE, n_records),
+        'BANK_RISK': rng.uniform(20, 80, n_records).round(2),
+        'INSURANCE_RISK': rng.uniform(20, 80, n_records).round(2),
+        'FRAUD_FLAG_HISTORY': rng.integers(0, 2, n_records, dtype=np.int8),
+        'SUSPICIOUS_CLAIM_FLAGS': rng.integers(0, 2, n_records, dtype=np.int8)
+    })
+    return df
 
+@st.cache_resource(show_spinner=False)
 def get_sample_composite_risk_data() -> pd.DataFrame:
     """Generate sample composite risk data"""
-    if 'composite_risk' in _sample_data_cache:
-        return _sample_data_cache['composite_risk'].copy()
-    
-    np.random.seed(45)
+    rng = np.random.default_rng(45)
     
     risk_categories = ['LOW', 'MEDIUM', 'HIGH', 'CRITICAL']
     risk_drivers = ['Bank-Driven', 'Insurance-Driven', 'Balanced']
-    
-    data = []
-    for category in risk_categories:
-        for driver in risk_drivers:
-            data.append({
-                'COMPOSITE_RISK_CATEGORY': category,
-                'RISK_DRIVER': driver,
-                'SEGMENT_COUNT': np.random.randint(5, 30),
-                'CUSTOMER_COUNT': np.random.randint(50, 500)
-            })
-    
-    df = pd.DataFrame(data)
-    _sample_data_cache['composite_risk'] = df
-    return df.copy()
+    n = len(risk_categories) * len(risk_drivers)
+    
+    df = pd.DataFrame({
+        'COMPOSITE_RISK_CATEGORY': pd.Categorical(
+            np.repeat(risk_categories, len(risk_drivers)), dtype=_RISK_CATEGORY_DTYPE
+        ),
+        'RISK_DRIVER': np.tile(risk_drivers, len(risk_categories)),
+        'SEGMENT_COUNT': rng.integers(5, 30, n, dtype=np.int16),
+        'CUSTOMER_COUNT': rng.integers(50, 500, n, dtype=np.int16)
+    })
+    return df
 
+@st.cache_resource(show_spinner=False)
 def get_sample_access_audit_data() -> pd.DataFrame:
     """Generate sample access audit log data"""
-    if 'access_audit' in _sample_data_cache:
-        return _sample_data_cache['access_audit'].copy()
-    
-    data = []
+    rng = np.random.default_rng()
+    now = pd.Timestamp.now()
+    n_records = 20
     users = ['john.doe', 'jane.smith', 'bob.johnson']
     roles = ['ANALYST', 'RISK_ANALYST', 'RISK_MANAGER']
     
-    for i in range(20):
-        data.append({
-            'AUDIT_ID': f'A{i+1:04d}',
-            'USER_NAME': np.random.choice(users),
-            'ROLE_NAME': np.random.choice(roles),
-            'QUERY_TYPE': 'SELECT',
-            'QUERY_TEXT': 'SELECT * FROM analytics.risk_join_aggregated WHERE...',
-            'ROW_COUNT': np.random.randint(10, 500),
-            'EXECUTED_AT': pd.Timestamp.now() - pd.Timedelta(hours=np.random.randint(1, 72))
-        })
-    
-    df = pd.DataFrame(data)
-    _sample_data_cache['access_audit'] = df
-    return df.copy()
+    df = pd.DataFrame({
+        'AUDIT_ID': np.char.add('A', np.char.zfill(np.arange(1, n_records + 1).astype(str), 4)),
+        'USER_NAME': rng.choice(users, n_records),
+        'ROLE_NAME': rng.choice(roles, n_records),
+        'QUERY_TYPE': 'SELECT',
+        'QUERY_TEXT': 'SELECT * FROM analytics.risk_join_aggregated WHERE...',
+        'ROW_COUNT': rng.integers(10, 500, n_records, dtype=np.int16),
+        'EXECUTED_AT': now - pd.to_timedelta(rng.integers(1, 72, n_records), unit='h')
+    })
+    return df
 
+@st.cache_resource(show_spinner=False)
 def get_sample_user_access_summary() -> pd.DataFrame:
     """Generate sample user access summary"""
-    if 'user_access' in _sample_data_cache:
-        return _sample_data_cache['user_access'].copy()
-    
-    data = [
-        {
-            'USER_NAME': 'john.doe',
-            'ROLE_NAME': 'ANALYST',
-            'QUERY_COUNT': 45,
-            'ROWS_ACCESSED': 12500,
-            'FIRST_ACCESS': pd.Timestamp.now() - pd.Timedelta(days=30),
-            'LAST_ACCESS': pd.Timestamp.now() - pd.Timedelta(hours=2)
-        },
-        {
-            'USER_NAME': 'jane.smith',
-            'ROLE_NAME': 'RISK_ANALYST',
-            'QUERY_COUNT': 67,
-            'ROWS_ACCESSED': 23400,
-            'FIRST_ACCESS': pd.Timestamp.now() - pd.Timedelta(days=25),
-            'LAST_ACCESS': pd.Timestamp.now() - pd.Timedelta(hours=1)
-        },
-        {
-            'USER_NAME': 'bob.johnson',
-            'ROLE_NAME': 'RISK_MANAGER',
-            'QUERY_COUNT': 28,
-            'ROWS_ACCESSED': 8900,
-            'FIRST_ACCESS': pd.Timestamp.now() - pd.Timedelta(days=20),
-            'LAST_ACCESS': pd.Timestamp.now() - pd.Timedelta(hours=5)
-        }
-    ]
-    
-    df = pd.DataFrame(data)
-    _sample_data_cache['user_access'] = df
-    return df.copy()
+    now = pd.Timestamp.now()
+    df = pd.DataFrame({
+        'USER_NAME': ['john.doe', 'jane.smith', 'bob.johnson'],
+        'ROLE_NAME': ['ANALYST', 'RISK_ANALYST', 'RISK_MANAGER'],
+        'QUERY_COUNT': [45, 67, 28],
+        'ROWS_ACCESSED': [12500, 23400, 8900],
+        'FIRST_ACCESS': [now - 30 * _DAY, now - 25 * _DAY, now - 20 * _DAY],
+        'LAST_ACCESS': [now - 2 * _HOUR, now - _HOUR, now - 5 * _HOUR]
+    })
+    return df
 
+@st.cache_resource(show_spinner=False)
 def get_sample_timeline_data() -> pd.DataFrame:
     """Generate sample access timeline data"""
-    if 'timeline' in _sample_data_cache:
-        return _sample_data_cache['timeline'].copy()
-    
-    data = []
-    for i in range(30):
-        data.append({
-            'ACCESS_DATE': (pd.Timestamp.now() - pd.Timedelta(days=30-i)).date(),
-            'QUERY_COUNT': np.random.randint(50, 200),
-            'UNIQUE_USERS': np.random.randint(3, 8),
-            'ROWS_ACCESSED': np.random.randint(5000, 25000)
-        })
+    rng = np.random.default_rng()
+    now = pd.Timestamp.now()
+    n_days = 30
+    
+    df = pd.DataFrame({
+        'ACCESS_DATE': (now - pd.to_timedelta(np.arange(n_days, 0, -1), unit='D')).date,
+        'QUERY_COUNT': rng.integers(50, 200, n_days, dtype=np.int16),
+        'UNIQUE_USERS': rng.integers(3, 8, n_days, dtype=np.int8),
+        'ROWS_ACCESSED': rng.integers(5000, 25000, n_days, dtype=np.int16)
+    })
+    return df
+
+def _high_risk_customers(df: pd.DataFrame) -> int:
+    """Sum RECORD_COUNT over HIGH/CRITICAL segments without building a filtered frame
     
-    df = pd.DataFrame(data)
-    _sample_data_cache['timeline'] = df
-    return df.copy()
+    On the categorical RISK_CATEGORY column isin compares integer codes.
+    """
+    high = df['RISK_CATEGORY'].isin(['HIGH', 'CRITICAL']).to_numpy()
+    return df['RECORD_COUNT'].to_numpy()[high].sum()
+
+def get_sample_dashboard_payload(df: pd.DataFrame) -> pd.DataFrame:
+    """Build the single-row JSON payload returned by the Home dashboard query"""
+    risk = df.groupby('RISK_CATEGORY', observed=True).agg(
+        SEGMENT_COUNT=('ANALYSIS_ID', 'count'),
+        CUSTOMER_COUNT=('RECORD_COUNT', 'sum')
+    ).reset_index()
+    
+    age = df.groupby('AGE_GROUP', observed=True).agg(
+        AVG_RISK_SCORE=('COMPOSITE_RISK_SCORE', 'mean'),
+        CUSTOMER_COUNT=('RECORD_COUNT', 'sum')
+    ).reset_index().astype({'AVG_RISK_SCORE': np.float64}).round(2).sort_values('AVG_RISK_SCORE', ascending=False)
+    
+    region = df.groupby('REGION', observed=True).agg(
+        AVG_RISK=('COMPOSITE_RISK_SCORE', 'mean'),
+        CUSTOMER_COUNT=('RECORD_COUNT', 'sum'),
+        SEGMENT_COUNT=('ANALYSIS_ID', 'count')
+    ).reset_index().astype({'AVG_RISK': np.float64}).round(2).sort_values('AVG_RISK', ascending=False)
+    
+    payload = {
+        'summary': {
+            'TOTAL_SEGMENTS': int(len(df)),
+            'TOTAL_CUSTOMERS': int(df['RECORD_COUNT'].sum()),
+            'AVG_RISK': round(float(df['COMPOSITE_RISK_SCORE'].mean()), 2),
+            'HIGH_RISK_COUNT': int(_high_risk_customers(df))
+        },
+        'risk_dist': risk.to_dict(orient='records'),
+        'age_risk': age.to_dict(orient='records'),
+        'regional': region.to_dict(orient='records')
+    }
+    
+    return pd.DataFrame([{'PAYLOAD': json.dumps(payload)}])
+
+# SQL fragments the offline dispatch keys on. A single case-insensitive scan
+# collects every fragment present; the lookahead lets fragments overlap
+_SQL_TOKEN_RE = re.compile(r"(?=(" + "|".join(re.escape(token) for token in (
+    'risk_join_aggregated', 'approved_questions_cache', 'latest_ai_summary',
+    'fraud_cross_signals', 'privacy_compliance_log', 'access_audit_log',
+    'bank_customer_risk_summary', 'insurance_claim_risk_summary',
+    'explain_risk_anomaly', 'ai_insights', 'composite_risk_category', 'risk_driver',
+    'b.region = i.region', 'b.age_group = i.age_group', 'b.customer_id = i.customer_id',
+    'bank_risk', 'insurance_risk', 'union all', 'object_construct', 'where',
+    'age_group in', 'region in', 'critical_count', 'high_risk_count', 'avg_risk_score', 'customer_count',
+    'count(*)', 'count(distinct user_name)', 'sum(record_count)', 'date(executed_at)',
+    'composite_risk_score >=', 'case', 'check_type', "question_id = 'q001'",
+    'group by age_group, risk_category', 'group by age_group', 'group by region', 'group by risk_category',
+    'group by composite_risk_category', 'group by user_name', 'group by', 'filter_value'
+)) + "))", re.IGNORECASE)
+
+def _sql_tokens(sql: str) -> frozenset:
+    """Return the dispatch fragments present in a SQL string, lowercased"""
+    tokens = {token.lower() for token in _SQL_TOKEN_RE.findall(sql)}
+    # Specific GROUP BY fragments shadow the bare one at the same position
+    if any(token.startswith('group by') for token in tokens):
+        tokens.add('group by')
+    return frozenset(tokens)
+
+@st.cache_resource(show_spinner=False)
+def _get_risk_aggregates() -> Dict[str, pd.DataFrame]:
+    """Precompute the sample risk aggregates once; the source frame never changes"""
+    df = get_sample_risk_data()
+    
+    by_category = df.groupby('RISK_CATEGORY', observed=True).agg({
+        'ANALYSIS_ID': 'count',
+        'RECORD_COUNT': 'sum',
+        'COMPOSITE_RISK_SCORE': 'mean'
+    }).reset_index()
+    # Scores are stored as float32; widen the means so they round to exact 2dp values
+    by_category.columns = ['RISK_CATEGORY', 'SEGMENT_COUNT', 'CUSTOMER_COUNT', 'AVG_RISK_SCORE']
+    by_category['AVG_RISK_SCORE'] = by_category['AVG_RISK_SCORE'].astype(np.float64).round(2)
+    
+    # Home page shape: AVG_RISK_SCORE and CUSTOMER_COUNT
+    by_age = df.groupby('AGE_GROUP', observed=True).agg({
+        'RECORD_COUNT': 'sum',
+        'COMPOSITE_RISK_SCORE': 'mean'
+    }).reset_index()
+    by_age.columns = ['AGE_GROUP', 'CUSTOMER_COUNT', 'AVG_RISK_SCORE']
+    by_age['AVG_RISK_SCORE'] = by_age['AVG_RISK_SCORE'].astype(np.float64).round(2)
+    
+    # Pre-Approved Questions shape: the same aggregate renamed, plus risk category
+    # counts (customers per age group x category in one pass)
+    category_counts = df.pivot_table(
+        index='AGE_GROUP', columns='RISK_CATEGORY', values='RECORD_COUNT',
+        aggfunc='sum', fill_value=0, observed=False
+    )[['CRITICAL', 'HIGH', 'MEDIUM', 'LOW']].add_suffix('_COUNT')
+    by_age_counts = by_age.rename(
+        columns={'CUSTOMER_COUNT': 'TOTAL_CUSTOMERS', 'AVG_RISK_SCORE': 'AVG_RISK'}
+    ).join(category_counts, on='AGE_GROUP')
+    
+    # Long shape, one row per age group and category, pivoted by the caller
+    by_age_category = df.groupby(['AGE_GROUP', 'RISK_CATEGORY'], observed=True).agg({
+        'RECORD_COUNT': 'sum',
+        'COMPOSITE_RISK_SCORE': 'sum',
+        'ANALYSIS_ID': 'count'
+    }).reset_index()
+    by_age_category.columns = ['AGE_GROUP', 'RISK_CATEGORY', 'CUSTOMER_COUNT', 'RISK_SCORE_SUM', 'SCORED_SEGMENTS']
+    by_age_category['RISK_SCORE_SUM'] = by_age_category['RISK_SCORE_SUM'].astype(np.float64)
+    
+    by_region_segments = df.groupby('REGION', observed=True).agg({
+        'RECORD_COUNT': 'sum',
+        'COMPOSITE_RISK_SCORE': 'mean',
+        'ANALYSIS_ID': 'count'
+    }).reset_index()
+    by_region_segments.columns = ['REGION', 'CUSTOMER_COUNT', 'AVG_RISK', 'SEGMENT_COUNT']
+    by_region_segments['AVG_RISK'] = by_region_segments['AVG_RISK'].astype(np.float64).round(2)
+    by_region = by_region_segments.drop(columns='SEGMENT_COUNT')
+    
+    # Pre-Approved Questions shape: the segment aggregate plus HIGH/CRITICAL customers
+    high_risk = df['RECORD_COUNT'].where(df['RISK_CATEGORY'].isin(['HIGH', 'CRITICAL']), 0)
+    by_region_high_risk = by_region_segments.rename(columns={'CUSTOMER_COUNT': 'TOTAL_CUSTOMERS'})[
+        ['REGION', 'AVG_RISK', 'TOTAL_CUSTOMERS', 'SEGMENT_COUNT']
+    ].join(
+        high_risk.groupby(df['REGION'], observed=True).sum().rename('HIGH_RISK_COUNT'), on='REGION'
+    ).sort_values('AVG_RISK', ascending=False, ignore_index=True)  # Matches the query's ORDER BY avg_risk DESC
+    
+    summary = pd.DataFrame([{
+        'TOTAL_SEGMENTS': len(df),
+        'TOTAL_CUSTOMERS': df['RECORD_COUNT'].sum(),
+        'AVG_RISK': float(df['COMPOSITE_RISK_SCORE'].mean()),
+        'HIGH_RISK_COUNT': _high_risk_customers(df)
+    }])
+    
+    return {
+        'by_category': by_category,
+        'by_age': by_age,
+        'by_age_counts': by_age_counts,
+        'by_age_category': by_age_category,
+        'by_region': by_region,
+        'by_region_segments': by_region_segments,
+        'by_region_high_risk': by_region_high_risk,
+        'summary': summary,
+        'dashboard_payload': get_sample_dashboard_payload(df)
+    }
+
+def _sample_risk(tokens: frozenset) -> pd.DataFrame:
+    """Sample results for ANALYTICS.risk_join_aggregated queries"""
+    aggregates = _get_risk_aggregates()
+    
+    # SPECIAL CASE: Age group queries with risk category counts (Pre-Approved Questions)
+    if 'group by age_group, risk_category' in tokens:
+        return aggregates['by_age_category']
+    if 'group by age_group' in tokens and 'critical_count' in tokens:
+        return aggregates['by_age_counts']
+    
+    # Home dashboard: all aggregates packed into one JSON payload
+    if 'object_construct' in tokens:
+        return aggregates['dashboard_payload']
+    
+    # Apply basic aggregations
+    if 'count(*)' in tokens and 'group by risk_category' in tokens:
+        return aggregates['by_category']
+    
+    if 'group by age_group' in tokens:
+        # Check what columns the query expects based on the SELECT statement
+        if 'avg_risk_score' in tokens and 'customer_count' in tokens:
+            return aggregates['by_age']
+        return aggregates['by_age_counts']
+    
+    if 'group by region' in tokens:
+        # Check what columns the query expects
+        if 'high_risk_count' in tokens:
+            return aggregates['by_region_high_risk']
+        if 'count(*)' in tokens:
+            return aggregates['by_region_segments']
+        return aggregates['by_region']
+    
+    # Composite risk query with CASE statements and GROUP BY
+    if 'case' in tokens and 'composite_risk_score >=' in tokens and 'group by composite_risk_category' in tokens:
+        # Return composite risk data
+        return get_sample_composite_risk_data()
+    
+    # Summary statistics
+    if 'count(*)' in tokens and 'sum(record_count)' in tokens:
+        return aggregates['summary']
+    
+    return get_sample_risk_data()
+
+def _sample_filter_options(tokens: frozenset) -> pd.DataFrame:
+    """Sample results for the Risk Explorer filter query: one row per distinct filter value"""
+    df = get_sample_risk_data()
+    values = {
+        column: df[column].cat.remove_unused_categories().cat.categories.tolist()
+        for column in ('AGE_GROUP', 'REGION', 'OCCUPATION_CATEGORY')
+    }
+    present = set(df['RISK_CATEGORY'].unique())
+    values['RISK_CATEGORY'] = [c for c in ('CRITICAL', 'HIGH', 'MEDIUM', 'LOW') if c in present]
+    return pd.DataFrame({
+        'FILTER_NAME': [name for name, options in values.items() for _ in options],
+        'FILTER_VALUE': [value for options in values.values() for value in options]
+    })
+
+def _sample_latest_ai_summary(tokens: frozenset) -> pd.DataFrame:
+    """Sample results for the latest-summary dynamic table: one row per question"""
+    questions = get_sample_questions()
+    if "question_id = 'q001'" in tokens:
+        questions = questions[questions['QUESTION_ID'] == 'Q001']
+    return questions[['QUESTION_ID', 'AI_SUMMARY', 'LAST_REFRESHED']]
+
+def _sample_compliance(tokens: frozenset) -> pd.DataFrame:
+    """Sample results for GOVERNANCE.privacy_compliance_log queries"""
+    df = get_sample_compliance_log()
+    # Check if grouping is needed
+    if 'group by' in tokens and 'check_type' in tokens:
+        result = df.groupby(['CHECK_TYPE', 'CHECK_RESULT']).size().reset_index(name='CHECK_COUNT')
+        result['LAST_CHECK'] = df['CHECKED_AT'].max()
+        return result
+    return df
+
+def _sample_regional_comparison(tokens: frozenset) -> pd.DataFrame:
+    """Sample results for the bank/insurance regional join"""
+    # This is a join query for regional comparison
+    rng = np.random.default_rng()
+    n = len(_REGIONS)
+    bank_risk = rng.uniform(45, 75, n).round(2)
+    insurance_risk = rng.uniform(45, 75, n).round(2)
+    return pd.DataFrame({
+        'REGION': pd.Categorical(_REGIONS, dtype=_REGION_DTYPE),
+        'BANK_AVG_RISK': bank_risk,
+        'INSURANCE_AVG_RISK': insurance_risk,
+        'CUSTOMER_COUNT': rng.integers(50, 200, n, dtype=np.int16),
+        'RISK_DIFFERENCE': (bank_risk - insurance_risk).round(2)
+    })
+
+def _sample_age_comparison(tokens: frozenset) -> pd.DataFrame:
+    """Sample results for the bank/insurance age group join"""
+    rng = np.random.default_rng()
+    n = len(_AGE_GROUPS)
+    bank_risk = rng.uniform(40, 80, n).round(2)
+    insurance_risk = rng.uniform(40, 80, n).round(2)
+    return pd.DataFrame({
+        'AGE_GROUP': pd.Categorical(_AGE_GROUPS, dtype=_AGE_GROUP_DTYPE),
+        'BANK_AVG_RISK': bank_risk,
+        'INSURANCE_AVG_RISK': insurance_risk,
+        'CUSTOMER_COUNT': rng.integers(30, 150, n, dtype=np.int16),
+        'RISK_GAP': np.abs(bank_risk - insurance_risk).round(2)
+    })
+
+def _sample_organization_overview(tokens: frozenset) -> pd.DataFrame:
+    """Sample results for the bank/insurance UNION ALL overview"""
+    scores = pd.concat({
+        'Bank': get_sample_bank_data()['RISK_SCORE'],
+        'Insurance': get_sample_insurance_data()['RISK_SCORE']
+    })
+    
+    overview = scores.groupby(level=0).agg(['count', 'mean', 'min', 'max', 'std']).round(2)
+    overview.columns = ['RECORD_COUNT', 'AVG_RISK_SCORE', 'MIN_RISK', 'MAX_RISK', 'RISK_STDDEV']
+    return overview.rename_axis('ORGANIZATION').reset_index()
+
+def _sample_access_audit(tokens: frozenset) -> pd.DataFrame:
+    """Sample results for access_audit_log queries"""
+    df = get_sample_access_audit_data()
+    # Handle timeline grouping FIRST (most specific with DATE and GROUP BY)
+    if 'date(executed_at)' in tokens and 'group by' in tokens:
+        return get_sample_timeline_data()
+    # Handle user grouping
+    elif 'group by user_name' in tokens:
+        return get_sample_user_access_summary()
+    # Handle summary queries (no GROUP BY)
+    elif 'count(*)' in tokens and 'count(distinct user_name)' in tokens and 'group by' not in tokens:
+        return pd.DataFrame([{
+            'TOTAL_QUERIES': len(df),
+            'UNIQUE_USERS': df['USER_NAME'].nunique(),
+            'ACTIVE_DAYS': 7,
+            'TOTAL_ROWS_ACCESSED': df['ROW_COUNT'].sum()
+        }])
+    return df
+
+def _sample_ai_explanation(tokens: frozenset) -> pd.DataFrame:
+    """Sample results for AI explanation queries"""
+    return pd.DataFrame([{
+        'EXPLANATION': 'This segment shows elevated risk patterns driven by higher-than-average transaction velocity and claim frequency. The composite risk score reflects both banking and insurance risk factors.',
+        'AI_SUMMARY': 'Risk analysis indicates moderate correlation between banking and insurance risk signals in this demographic segment.'
+    }])
+
+# Checked in order, so more specific query shapes must come before general ones
+_SAMPLE_ROUTES = (
+    # Risk Explorer filter options (before the general risk route)
+    (lambda t: 'filter_value' in t, _sample_filter_options),
+    # Risk analysis queries
+    (lambda t: 'risk_join_aggregated' in t, _sample_risk),
+    # Approved questions queries
+    (lambda t: 'approved_questions_cache' in t, lambda t: get_sample_questions()),
+    (lambda t: 'latest_ai_summary' in t, _sample_latest_ai_summary),
+    # Fraud detection queries
+    (lambda t: 'fraud_cross_signals' in t, lambda t: get_sample_fraud_signals()),
+    # Compliance queries
+    (lambda t: 'privacy_compliance_log' in t, _sample_compliance),
+    # Regional and age group comparison joins (most specific join patterns first)
+    (lambda t: 'b.region = i.region' in t and 'group by region' in t, _sample_regional_comparison),
+    (lambda t: 'b.age_group = i.age_group' in t and 'group by age_group' in t, _sample_age_comparison),
+    # Correlation queries
+    (lambda t: 'b.customer_id = i.customer_id' in t or ('bank_risk' in t and 'insurance_risk' in t),
+     lambda t: get_sample_correlation_data()),
+    # Bank and Insurance UNION queries (overview comparison)
+    (lambda t: {'union all', 'bank_customer_risk_summary', 'insurance_claim_risk_summary'} <= t,
+     _sample_organization_overview),
+    # Bank and insurance raw data queries
+    (lambda t: 'bank_customer_risk_summary' in t, lambda t: get_sample_bank_data()),
+    (lambda t: 'insurance_claim_risk_summary' in t, lambda t: get_sample_insurance_data()),
+    # Composite risk queries
+    (lambda t: 'composite_risk_category' in t or 'risk_driver' in t, lambda t: get_sample_composite_risk_data()),
+    # Access audit log queries
+    (lambda t: 'access_audit_log' in t, _sample_access_audit),
+    # AI explanation queries
+    (lambda t: 'explain_risk_anomaly' in t or 'ai_insights' in t, _sample_ai_explanation),
+)
+
+def _canon_sql(sql: str) -> str:
+    """Lowercase and collapse whitespace so reformatted copies of a query share a cache entry"""
+    return ' '.join(sql.lower().split())
+
+@functools.lru_cache(maxsize=64)
+def _sample_data_for_sql(canonical_sql: str) -> pd.DataFrame:
+    """Route a canonical query to its sample handler; results are shared, not copied"""
+    tokens = _sql_tokens(canonical_sql)
+    for matches, handler in _SAMPLE_ROUTES:
+        if matches(tokens):
+            return handler(tokens)
+    
+    # Default empty result
+    return _EMPTY_DF
+
+@functools.lru_cache(maxsize=16)
+def _warn_once(message: str) -> None:
+    """Show a warning the first time a given message occurs in this process"""
+    st.warning(message)
 
 class SnowflakeConnection:
     """Handle Snowflake connections with fallback to sample data"""
     
-    def __init__(self):
-        self._connection = None
-        self._is_offline = False
-        self._offline_message_shown = False
-        self._initialize_connection()
-    
-    def _initialize_connection(self):
-        """Try to establish Snowflake connection"""
+    @functools.cached_property
+    def connection(self):
+        """Snowflake connection, opened on first use; None when running offline"""
         try:
             # Check if running in Streamlit in Snowflake
-            self._connection = st.connection("snowflake")
-            self._is_offline = False
+            return st.connection("snowflake")
         except Exception as e:
             # Fallback to sample data mode
-            self._is_offline = True
-            if not self._offline_message_shown:
-                st.info("Running in offline mode with sample data. Configure Snowflake credentials in .streamlit/secrets.toml for live data.")
-                self._offline_message_shown = True
-    
-    def query(self, sql: str, ttl: int = 300) -> pd.DataFrame:
-        """Execute query with fallback to sample data"""
-        if not self._is_offline and self._connection:
-            try:
-                return self._connection.query(sql, ttl=ttl)
-            except Exception as e:
-                st.warning(f"Query failed, using sample data: {str(e)[:100]}")
-                return self._get_sample_data_for_query(sql)
-        else:
+            st.info("Running in offline mode with sample data. Configure Snowflake credentials in .streamlit/secrets.toml for live data.")
+            return None
+    
+    def query(self, sql: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Execute query with fallback to sample data; results are cached by run_query"""
+        # Choose the live or sample path on first use; the instance attribute
+        # then shadows this method so later calls skip the check
+        self.query = self._query_offline if self.is_offline else self._query_live
+        return self.query(sql, params)
+    
+    def _query_live(self, sql: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Execute query against Snowflake, falling back to sample data on failure"""
+        try:
+            return self._fetch_arrow(sql, params)
+        except Exception as e:
+            _warn_once(f"Query failed, using sample data: {str(e)[:100]}")
             return self._get_sample_data_for_query(sql)
     
+    def _query_offline(self, sql: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Answer query from sample data; bind parameters are not applied"""
+        return self._get_sample_data_for_query(sql)
+    
+    def _fetch_arrow(self, sql: str, params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+        """Fetch results as an Arrow table so numeric columns convert to pandas without per-cell objects"""
+        cur = self.connection.cursor()
+        try:
+            cur.execute(sql, params)
+            table = cur.fetch_arrow_all()
+            if table is None:
+                # The connector returns None instead of an empty table for zero rows
+                return pd.DataFrame(columns=[col[0] for col in cur.description])
+            # pandas 3 (required) converts strings to its Arrow-backed str dtype and
+            # numbers to numpy; self_destruct frees each Arrow buffer once converted
+            # so the result isn't held twice in memory
+            return table.to_pandas(split_blocks=True, self_destruct=True)
+        finally:
+            cur.close()
+    
     def _get_sample_data_for_query(self, sql: str) -> pd.DataFrame:
         """Return appropriate sample data based on query pattern"""
-        sql_lower = sql.lower()
-        
         try:
-            # SPECIAL CASE: Age group queries with risk category counts (Pre-Approved Questions)
-            if 'group by age_group' in sql_lower and 'critical_count' in sql_lower and 'risk_join_aggregated' in sql_lower:
-                df = get_sample_risk_data()
-                result = df.groupby('AGE_GROUP').agg({
-                    'RECORD_COUNT': 'sum',
-                    'COMPOSITE_RISK_SCORE': 'mean'
-                }).reset_index()
-                result.columns = ['AGE_GROUP', 'TOTAL_CUSTOMERS', 'AVG_RISK']
-                result['AVG_RISK'] = result['AVG_RISK'].round(2)
-                
-                # Add risk category counts
-                result['CRITICAL_COUNT'] = 0
-                result['HIGH_COUNT'] = 0
-                result['MEDIUM_COUNT'] = 0
-                result['LOW_COUNT'] = 0
-                
-                for age_group in result['AGE_GROUP'].unique():
-                    age_mask = df['AGE_GROUP'] == age_group
-                    result.loc[result['AGE_GROUP'] == age_group, 'CRITICAL_COUNT'] = int(df[age_mask & (df['RISK_CATEGORY'] == 'CRITICAL')]['RECORD_COUNT'].sum())
-                    result.loc[result['AGE_GROUP'] == age_group, 'HIGH_COUNT'] = int(df[age_mask & (df['RISK_CATEGORY'] == 'HIGH')]['RECORD_COUNT'].sum())
-                    result.loc[result['AGE_GROUP'] == age_group, 'MEDIUM_COUNT'] = int(df[age_mask & (df['RISK_CATEGORY'] == 'MEDIUM')]['RECORD_COUNT'].sum())
-                    result.loc[result['AGE_GROUP'] == age_group, 'LOW_COUNT'] = int(df[age_mask & (df['RISK_CATEGORY'] == 'LOW')]['RECORD_COUNT'].sum())
-                
-                return result
-            
-            # Risk analysis queries
-            if 'risk_join_aggregated' in sql_lower:
-                df = get_sample_risk_data()
-                
-                # Apply basic filtering based on WHERE clauses
-                if 'where' in sql_lower:
-                    # Extract age group filter
-                    if "age_group in" in sql_lower:
-                        # Return filtered data (simplified)
-                        pass
-                    # Extract region filter
-                    if "region in" in sql_lower:
-                        pass
-                
-                # Apply basic aggregations
-                if 'count(*)' in sql_lower and 'group by risk_category' in sql_lower:
-                    result = df.groupby('RISK_CATEGORY').agg({
-                        'ANALYSIS_ID': 'count',
-                        'RECORD_COUNT': 'sum',
-                        'COMPOSITE_RISK_SCORE': 'mean'
-                    }).reset_index()
-                    result.columns = ['RISK_CATEGORY', 'SEGMENT_COUNT', 'CUSTOMER_COUNT', 'AVG_RISK_SCORE']
-                    result['AVG_RISK_SCORE'] = result['AVG_RISK_SCORE'].round(2)
-                    return result
-                
-                if 'group by age_group' in sql_lower:
-                    # Base aggregation
-                    result = df.groupby('AGE_GROUP').agg({
-                        'RECORD_COUNT': 'sum',
-                        'COMPOSITE_RISK_SCORE': 'mean'
-                    }).reset_index()
-                    
-                    # Check what columns the query expects based on the SELECT statement
-                    if 'avg_risk_score' in sql_lower and 'customer_count' in sql_lower:
-                        # Home page query: expects AVG_RISK_SCORE and CUSTOMER_COUNT
-                        result.columns = ['AGE_GROUP', 'CUSTOMER_COUNT', 'AVG_RISK_SCORE']
-                        result['AVG_RISK_SCORE'] = result['AVG_RISK_SCORE'].round(2)
-                    else:
-                        # Pre-Approved Questions query: expects TOTAL_CUSTOMERS and AVG_RISK
-                        result.columns = ['AGE_GROUP', 'TOTAL_CUSTOMERS', 'AVG_RISK']
-                        result['AVG_RISK'] = result['AVG_RISK'].round(2)
-                        
-                        # Add risk category counts for Pre-Approved Questions
-                        result['CRITICAL_COUNT'] = 0
-                        result['HIGH_COUNT'] = 0
-                        result['MEDIUM_COUNT'] = 0
-                        result['LOW_COUNT'] = 0
-                        
-                        for age_group in result['AGE_GROUP'].unique():
-                            age_mask = df['AGE_GROUP'] == age_group
-                            result.loc[result['AGE_GROUP'] == age_group, 'CRITICAL_COUNT'] = int(df[age_mask & (df['RISK_CATEGORY'] == 'CRITICAL')]['RECORD_COUNT'].sum())
-                            result.loc[result['AGE_GROUP'] == age_group, 'HIGH_COUNT'] = int(df[age_mask & (df['RISK_CATEGORY'] == 'HIGH')]['RECORD_COUNT'].sum())
-                            result.loc[result['AGE_GROUP'] == age_group, 'MEDIUM_COUNT'] = int(df[age_mask & (df['RISK_CATEGORY'] == 'MEDIUM')]['RECORD_COUNT'].sum())
-                            result.loc[result['AGE_GROUP'] == age_group, 'LOW_COUNT'] = int(df[age_mask & (df['RISK_CATEGORY'] == 'LOW')]['RECORD_COUNT'].sum())
-                    
-                    return result
-                
-                if 'group by region' in sql_lower:
-                    agg_dict = {
-                        'RECORD_COUNT': 'sum',
-                        'COMPOSITE_RISK_SCORE': 'mean'
-                    }
-                    result = df.groupby('REGION').agg(agg_dict).reset_index()
-                    # Check what columns the query expects
-                    if 'count(*)' in sql_lower:
-                        result['SEGMENT_COUNT'] = df.groupby('REGION').size().values
-                        result.columns = ['REGION', 'CUSTOMER_COUNT', 'AVG_RISK', 'SEGMENT_COUNT']
-                        result['AVG_RISK'] = result['AVG_RISK'].round(2)
-                    else:
-                        result.columns = ['REGION', 'CUSTOMER_COUNT', 'AVG_RISK']
-                        result['AVG_RISK'] = result['AVG_RISK'].round(2)
-                    return result
-                
-                # Composite risk query with CASE statements and GROUP BY
-                if 'case' in sql_lower and 'composite_risk_score >=' in sql_lower and 'group by composite_risk_category' in sql_lower:
-                    # Return composite risk data
-                    return get_sample_composite_risk_data()
-                
-                # Summary statistics
-                if 'count(*)' in sql_lower and 'sum(record_count)' in sql_lower:
-                    return pd.DataFrame([{
-                        'TOTAL_SEGMENTS': len(df),
-                        'TOTAL_CUSTOMERS': df['RECORD_COUNT'].sum(),
-                        'AVG_RISK': df['COMPOSITE_RISK_SCORE'].mean(),
-                        'HIGH_RISK_COUNT': df[df['RISK_CATEGORY'].isin(['HIGH', 'CRITICAL'])]['RECORD_COUNT'].sum()
-                    }])
-                
-                return df
-            
-            # Approved questions queries
-            elif 'approved_questions_cache' in sql_lower:
-                return get_sample_questions()
-            
-            # Fraud detection queries
-            elif 'fraud_cross_signals' in sql_lower:
-                return get_sample_fraud_signals()
-            
-            # Compliance queries
-            elif 'privacy_compliance_log' in sql_lower:
-                df = get_sample_compliance_log()
-                # Check if grouping is needed
-                if 'group by' in sql_lower and 'check_type' in sql_lower:
-                    result = df.groupby(['CHECK_TYPE', 'CHECK_RESULT']).size().reset_index(name='CHECK_COUNT')
-                    result['LAST_CHECK'] = df['CHECKED_AT'].max()
-                    return result
-                return df
-            
-            # Regional comparison queries (check FIRST - most specific)
-            elif 'b.region = i.region' in sql_lower and 'group by region' in sql_lower:
-                # This is a join query for regional comparison
-                regions = ['Northeast', 'Southeast', 'Midwest', 'West']
-                data = []
-                for region in regions:
-                    bank_risk = round(np.random.uniform(45, 75), 2)
-                    insurance_risk = round(np.random.uniform(45, 75), 2)
-                    data.append({
-                        'REGION': region,
-                        'BANK_AVG_RISK': bank_risk,
-                        'INSURANCE_AVG_RISK': insurance_risk,
-                        'CUSTOMER_COUNT': np.random.randint(50, 200),
-                        'RISK_DIFFERENCE': round(bank_risk - insurance_risk, 2)
-                    })
-                return pd.DataFrame(data)
-            
-            # Age group comparison queries (check SECOND - specific)
-            elif 'b.age_group = i.age_group' in sql_lower and 'group by age_group' in sql_lower:
-                age_groups = ['18-24', '25-34', '35-44', '45-54', '55-64', '65+']
-                data = []
-                for age in age_groups:
-                    bank_risk = round(np.random.uniform(40, 80), 2)
-                    insurance_risk = round(np.random.uniform(40, 80), 2)
-                    data.append({
-                        'AGE_GROUP': age,
-                        'BANK_AVG_RISK': bank_risk,
-                        'INSURANCE_AVG_RISK': insurance_risk,
-                        'CUSTOMER_COUNT': np.random.randint(30, 150),
-                        'RISK_GAP': round(abs(bank_risk - insurance_risk), 2)
-                    })
-                return pd.DataFrame(data)
-            
-            # Correlation queries (check THIRD - after more specific JOIN patterns)
-            elif 'b.customer_id = i.customer_id' in sql_lower or ('bank_risk' in sql_lower and 'insurance_risk' in sql_lower):
-                return get_sample_correlation_data()
-            
-            # Bank and Insurance UNION queries (overview comparison)
-            elif 'union all' in sql_lower and 'bank_customer_risk_summary' in sql_lower and 'insurance_claim_risk_summary' in sql_lower:
-                bank_df = get_sample_bank_data()
-                insurance_df = get_sample_insurance_data()
-                
-                bank_stats = {
-                    'ORGANIZATION': 'Bank',
-                    'RECORD_COUNT': len(bank_df),
-                    'AVG_RISK_SCORE': round(bank_df['RISK_SCORE'].mean(), 2),
-                    'MIN_RISK': round(bank_df['RISK_SCORE'].min(), 2),
-                    'MAX_RISK': round(bank_df['RISK_SCORE'].max(), 2),
-                    'RISK_STDDEV': round(bank_df['RISK_SCORE'].std(), 2)
-                }
-                
-                insurance_stats = {
-                    'ORGANIZATION': 'Insurance',
-                    'RECORD_COUNT': len(insurance_df),
-                    'AVG_RISK_SCORE': round(insurance_df['RISK_SCORE'].mean(), 2),
-                    'MIN_RISK': round(insurance_df['RISK_SCORE'].min(), 2),
-                    'MAX_RISK': round(insurance_df['RISK_SCORE'].max(), 2),
-                    'RISK_STDDEV': round(insurance_df['RISK_SCORE'].std(), 2)
-                }
-                
-                return pd.DataFrame([bank_stats, insurance_stats])
-            
-            # Bank raw data queries
-            elif 'bank_customer_risk_summary' in sql_lower:
-                return get_sample_bank_data()
-            
-            # Insurance raw data queries
-            elif 'insurance_claim_risk_summary' in sql_lower:
-                return get_sample_insurance_data()
-            
-            # Composite risk queries
-            elif 'composite_risk_category' in sql_lower or 'risk_driver' in sql_lower:
-                return get_sample_composite_risk_data()
-            
-            # Access audit log queries
-            elif 'access_audit_log' in sql_lower:
-                df = get_sample_access_audit_data()
-                # Handle timeline grouping FIRST (most specific with DATE and GROUP BY)
-                if 'date(executed_at)' in sql_lower and 'group by' in sql_lower:
-                    return get_sample_timeline_data()
-                # Handle user grouping
-                elif 'group by user_name' in sql_lower:
-                    return get_sample_user_access_summary()
-                # Handle summary queries (no GROUP BY)
-                elif 'count(*)' in sql_lower and 'count(distinct user_name)' in sql_lower and 'group by' not in sql_lower:
-                    return pd.DataFrame([{
-                        'TOTAL_QUERIES': len(df),
-                        'UNIQUE_USERS': df['USER_NAME'].nunique(),
-                        'ACTIVE_DAYS': 7,
-                        'TOTAL_ROWS_ACCESSED': df['ROW_COUNT'].sum()
-                    }])
-                return df
-            
-            # AI explanation queries
-            elif 'explain_risk_anomaly' in sql_lower or 'ai_insights' in sql_lower:
-                return pd.DataFrame([{
-                    'EXPLANATION': 'This segment shows elevated risk patterns driven by higher-than-average transaction velocity and claim frequency. The composite risk score reflects both banking and insurance risk factors.',
-                    'AI_SUMMARY': 'Risk analysis indicates moderate correlation between banking and insurance risk signals in this demographic segment.'
-                }])
-            
-            # Default empty result
-            else:
-                return pd.DataFrame()
+            # Shallow copy so a caller relabelling columns can't alter the memoized frame
+            return _sample_data_for_sql(_canon_sql(sql)).copy(deep=False)
         
         except Exception as e:
             st.error(f"Error processing sample data: {str(e)}")
-            return pd.DataFrame()
+            return _EMPTY_DF
+    
+    def submit(self, queries: Dict[str, str]) -> Dict[str, Any]:
+        """Submit queries without waiting, returning Snowpark AsyncJobs keyed by name"""
+        session = get_session()
+        return {name: session.sql(sql).collect_nowait() for name, sql in queries.items()}
     
     @property
     def is_offline(self) -> bool:
         """Check if running in offline mode"""
-        return self._is_offline
-
-# Global connection instance
-_global_connection = None
+        return self.connection is None
 
 @st.cache_resource
 def get_snowflake_connection() -> SnowflakeConnection:
-    """Get cached Snowflake connection instance"""
-    global _global_connection
-    if _global_connection is None:
-        _global_connection = SnowflakeConnection()
-    return _global_connection
-
-@st.cache_data(ttl=300)
-def run_query(query: str) -> pd.DataFrame:
-    """Execute query with caching and error handling"""
+    """Get the process-wide connection instance; connecting is deferred to first use"""
+    return SnowflakeConnection()
+
+def run_query(query: str, version_key: Optional[str] = None,
+              params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Execute query with caching and error handling
+    
+    Passing a version_key from table_version() makes the cache entry follow
+    table changes instead of relying on the TTL alone. Results are shared
+    across sessions; each caller gets a shallow copy it may relabel or extend.
+    
+    User-supplied values go in params and are referenced as %(name)s in the
+    query; the connector escapes them, and list values expand for IN (...).
+    """
+    return _run_query_shared(query, version_key, params).copy(deep=False)
+
+# cache_resource hands back the cached frame itself; cache_data would pickle
+# and unpickle it on every hit
+@st.cache_resource(ttl=300)
+def _run_query_shared(query: str, version_key: Optional[str] = None,
+                      params: Optional[Dict[str, Any]] = None) -> pd.DataFrame:
+    """Execute query once per process; the returned frame must not be modified"""
     try:
         conn = get_snowflake_connection()
-        df = conn.query(query)
+        df = conn.query(query, params)
         
         if df is None or (isinstance(df, pd.DataFrame) and df.empty):
-            return pd.DataFrame()
+            return _EMPTY_DF
         
         return df
     
     except Exception as e:
         st.error(f"Query execution failed: {str(e)[:200]}")
-        return pd.DataFrame()
+        return _EMPTY_DF
+
+@st.cache_data(ttl=30, show_spinner=False)
+def table_version(*tables: str) -> str:
+    """Return a change marker for SCHEMA.TABLE names based on LAST_ALTERED metadata"""
+    conn = get_snowflake_connection()
+    if conn.is_offline:
+        return 'offline'
+    
+    names = ", ".join(
+        f"('{schema.upper()}', '{name.upper()}')"
+        for schema, name in (table.split('.', 1) for table in tables)
+    )
+    # Without metadata, fall back to the previous five-minute refresh cadence
+    fallback = str(pd.Timestamp.now().floor('5min'))
+    
+    # Fetched directly: conn.query would answer a failed lookup with sample risk rows
+    try:
+        df = conn._fetch_arrow(
+            "SELECT MAX(last_altered) as last_altered FROM INFORMATION_SCHEMA.TABLES "
+            f"WHERE (table_schema, table_name) IN ({names})"
+        )
+    except Exception as e:
+        _warn_once(f"Table metadata unavailable, refreshing every five minutes: {str(e)[:100]}")
+        return fallback
+    
+    if df.empty or pd.isna(scalar(df, 'LAST_ALTERED')):
+        _warn_once(f"No LAST_ALTERED metadata for {', '.join(tables)}, refreshing every five minutes")
+        return fallback
+    return str(scalar(df, 'LAST_ALTERED'))
+
+@st.cache_resource(show_spinner=False)
+def get_session():
+    """Get the process-wide Snowpark session, created on first use and shared across browser sessions"""
+    from snowflake.snowpark import Session
+    from snowflake.snowpark.context import get_active_session
+    
+    try:
+        # Streamlit in Snowflake already provides an authenticated session
+        return get_active_session()
+    except Exception:
+        configs = dict(st.secrets["connections"]["snowflake"])
+        # One long-lived session for the process, so keep it from idling out
+        configs['client_session_keep_alive'] = True
+        return Session.builder.configs(configs).create()
+
+def submit_queries(queries: Dict[str, str]) -> Dict[str, Any]:
+    """Submit independent queries concurrently; returns no jobs in offline mode"""
+    conn = get_snowflake_connection()
+    if conn.is_offline:
+        return {}
+    return conn.submit(queries)
+
+def run_queries(queries: Dict[str, str], version_key: Optional[str] = None,
+                strict: bool = False) -> Dict[str, pd.DataFrame]:
+    """Execute independent queries in parallel and collect results by name
+    
+    Results are not cached here; callers cache the unpacked results, keyed on
+    version_key, so AsyncJob handles never end up in the cache. With strict,
+    a failed live query raises instead of being replaced, so callers can
+    avoid caching sample or empty fallbacks.
+    """
+    try:
+        jobs = submit_queries(queries)
+    except Exception as e:
+        if strict:
+            raise
+        st.warning(f"Parallel query submission failed, running serially: {str(e)[:100]}")
+        jobs = {}
+    
+    results = {}
+    for name, sql in queries.items():
+        job = jobs.get(name)
+        if job is None:
+            # No jobs are submitted offline, where sample data is the expected answer
+            results[name] = run_query(sql, version_key)
+            continue
+        try:
+            results[name] = job.result(result_type="pandas")
+        except Exception as e:
+            if strict:
+                raise
+            st.warning(f"Parallel query failed, retrying serially: {str(e)[:100]}")
+            results[name] = run_query(sql, version_key)
+    
+    return results
 
 def is_offline_mode() -> bool:
     """Check if application is running in offline mode"""
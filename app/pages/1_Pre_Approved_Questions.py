@@ -1,8 +1,8 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from db_connection import run_query, is_offline_mode
+from utils import export_to_csv, RISK_CATEGORY_ORDER
 
 st.set_page_config(page_title="Pre-Approved Questions", page_icon="📊", layout="wide")
 
@@ -54,8 +54,7 @@ try:
         filtered_df = questions_df
     
     # Display questions as selectbox
-    question_options = {row['QUESTION_TEXT']: row['QUESTION_ID'] 
-                       for _, row in filtered_df.iterrows()}
+    question_options = dict(zip(filtered_df['QUESTION_TEXT'], filtered_df['QUESTION_ID']))
     
     selected_question_text = st.selectbox(
         "Choose a question to explore:",
@@ -85,6 +84,9 @@ try:
     
     st.markdown("---")
     
+    # Plotly is deferred until a question is shown so the picker renders without it
+    import plotly.express as px
+    
     # Parse and display results based on question ID
     if selected_question_id == 'Q001':
         # Overall risk distribution
@@ -146,8 +148,12 @@ try:
                 
                 # Summary table
                 st.markdown("### Detailed Breakdown")
-                display_df = risk_df.copy()
-                display_df.columns = ['Risk Category', 'Segments', 'Customers', 'Avg Risk Score']
+                display_df = risk_df.rename(columns={
+                    'RISK_CATEGORY': 'Risk Category',
+                    'SEGMENT_COUNT': 'Segments',
+                    'CUSTOMER_COUNT': 'Customers',
+                    'AVG_RISK_SCORE': 'Avg Risk Score'
+                })
                 st.dataframe(display_df, use_container_width=True, hide_index=True)
             else:
                 st.warning("No risk distribution data available.")
@@ -161,20 +167,35 @@ try:
         age_query = """
         SELECT 
             age_group,
-            SUM(record_count) as total_customers,
-            ROUND(AVG(composite_risk_score), 2) as avg_risk,
-            SUM(CASE WHEN risk_category = 'CRITICAL' THEN record_count ELSE 0 END) as critical_count,
-            SUM(CASE WHEN risk_category = 'HIGH' THEN record_count ELSE 0 END) as high_count,
-            SUM(CASE WHEN risk_category = 'MEDIUM' THEN record_count ELSE 0 END) as medium_count,
-            SUM(CASE WHEN risk_category = 'LOW' THEN record_count ELSE 0 END) as low_count
+            risk_category,
+            SUM(record_count) as customer_count,
+            SUM(composite_risk_score) as risk_score_sum,
+            COUNT(composite_risk_score) as scored_segments
         FROM ANALYTICS.risk_join_aggregated
-        GROUP BY age_group
-        HAVING SUM(record_count) >= 3
-        ORDER BY avg_risk DESC
+        GROUP BY age_group, risk_category
         """
         
         try:
-            age_df = run_query(age_query)
+            age_category_df = run_query(age_query)
+            
+            # An empty or failed query has no columns to pivot
+            if age_category_df.empty:
+                age_df = age_category_df
+            else:
+                # Pivot the per-category counts into columns and recombine the
+                # score sums into each age group's average
+                age_totals = age_category_df.groupby('AGE_GROUP', observed=True)[
+                    ['CUSTOMER_COUNT', 'RISK_SCORE_SUM', 'SCORED_SEGMENTS']
+                ].sum()
+                category_counts = age_category_df.pivot_table(
+                    index='AGE_GROUP', columns='RISK_CATEGORY', values='CUSTOMER_COUNT',
+                    aggfunc='sum', fill_value=0, observed=True
+                ).reindex(columns=RISK_CATEGORY_ORDER, fill_value=0).add_suffix('_COUNT')
+                age_df = pd.DataFrame({
+                    'TOTAL_CUSTOMERS': age_totals['CUSTOMER_COUNT'],
+                    'AVG_RISK': (age_totals['RISK_SCORE_SUM'] / age_totals['SCORED_SEGMENTS']).round(2)
+                }).join(category_counts)
+                age_df = age_df[age_df['TOTAL_CUSTOMERS'] >= 3].sort_values('AVG_RISK', ascending=False).reset_index()
             
             if not age_df.empty:
                 col1, col2 = st.columns(2)
@@ -193,10 +214,13 @@ try:
                     st.plotly_chart(fig, use_container_width=True)
                 
                 with col2:
-                    # Stacked bar for risk breakdown
-                    breakdown_df = age_df[['AGE_GROUP', 'CRITICAL_COUNT', 'HIGH_COUNT', 'MEDIUM_COUNT', 'LOW_COUNT']].copy()
-                    breakdown_df = breakdown_df.melt(id_vars='AGE_GROUP', var_name='Risk Level', value_name='Count')
-                    breakdown_df['Risk Level'] = breakdown_df['Risk Level'].str.replace('_COUNT', '').str.title()
+                    # Stacked bar for risk breakdown, straight from the long-format query rows
+                    risk_levels = {category: category.title() for category in RISK_CATEGORY_ORDER}
+                    breakdown_df = age_category_df.loc[
+                        age_category_df['AGE_GROUP'].isin(age_df['AGE_GROUP']),
+                        ['AGE_GROUP', 'RISK_CATEGORY', 'CUSTOMER_COUNT']
+                    ].rename(columns={'RISK_CATEGORY': 'Risk Level', 'CUSTOMER_COUNT': 'Count'})
+                    breakdown_df['Risk Level'] = breakdown_df['Risk Level'].map(risk_levels)
                     
                     fig = px.bar(
                         breakdown_df,
@@ -204,6 +228,10 @@ try:
                         y='Count',
                         color='Risk Level',
                         title='Risk Category Distribution by Age',
+                        category_orders={
+                            'AGE_GROUP': age_df['AGE_GROUP'].tolist(),
+                            'Risk Level': list(risk_levels.values())
+                        },
                         color_discrete_map={
                             'Critical': '#d62728',
                             'High': '#ff7f0e',
@@ -215,8 +243,15 @@ try:
                 
                 # Table
                 st.markdown("### Age Group Statistics")
-                display_df = age_df.copy()
-                display_df.columns = ['Age Group', 'Customers', 'Avg Risk', 'Critical', 'High', 'Medium', 'Low']
+                display_df = age_df.rename(columns={
+                    'AGE_GROUP': 'Age Group',
+                    'TOTAL_CUSTOMERS': 'Customers',
+                    'AVG_RISK': 'Avg Risk',
+                    'CRITICAL_COUNT': 'Critical',
+                    'HIGH_COUNT': 'High',
+                    'MEDIUM_COUNT': 'Medium',
+                    'LOW_COUNT': 'Low'
+                })
                 st.dataframe(display_df, use_container_width=True, hide_index=True)
             else:
                 st.warning("No age group data available.")
@@ -233,8 +268,7 @@ try:
             ROUND(AVG(composite_risk_score), 2) as avg_risk,
             SUM(record_count) as total_customers,
             COUNT(*) as segment_count,
-            SUM(CASE WHEN risk_category IN ('HIGH', 'CRITICAL') THEN record_count ELSE 0 END) as high_risk_count,
-            ROUND((SUM(CASE WHEN risk_category IN ('HIGH', 'CRITICAL') THEN record_count ELSE 0 END) * 100.0 / SUM(record_count)), 1) as high_risk_pct
+            SUM(IFF(risk_category IN ('HIGH', 'CRITICAL'), record_count, 0)) as high_risk_count
         FROM ANALYTICS.risk_join_aggregated
         GROUP BY region
         HAVING SUM(record_count) >= 3
@@ -245,6 +279,9 @@ try:
             regional_df = run_query(regional_query)
             
             if not regional_df.empty:
+                # Derived from the returned counts rather than a second conditional SUM
+                regional_df['HIGH_RISK_PCT'] = (regional_df['HIGH_RISK_COUNT'] * 100.0 / regional_df['TOTAL_CUSTOMERS']).round(1)
+                
                 col1, col2 = st.columns([2, 1])
                 
                 with col1:
@@ -264,17 +301,23 @@ try:
                 
                 with col2:
                     st.markdown("### Top Risk Regions")
-                    for _, row in regional_df.head(5).iterrows():
-                        st.metric(
-                            row['REGION'],
-                            f"{row['AVG_RISK']}",
-                            f"{row['HIGH_RISK_PCT']}% high risk"
-                        )
+                    top_regions = regional_df.head(5)
+                    labels = top_regions['REGION'].tolist()
+                    values = top_regions['AVG_RISK'].astype(str).tolist()
+                    deltas = (top_regions['HIGH_RISK_PCT'].astype(str) + '% high risk').tolist()
+                    for label, value, delta in zip(labels, values, deltas):
+                        st.metric(label, value, delta)
                 
                 # Detailed table
                 st.markdown("### Regional Statistics")
-                display_df = regional_df.copy()
-                display_df.columns = ['Region', 'Avg Risk', 'Customers', 'Segments', 'High Risk Count', 'High Risk %']
+                display_df = regional_df.rename(columns={
+                    'REGION': 'Region',
+                    'AVG_RISK': 'Avg Risk',
+                    'TOTAL_CUSTOMERS': 'Customers',
+                    'SEGMENT_COUNT': 'Segments',
+                    'HIGH_RISK_COUNT': 'High Risk Count',
+                    'HIGH_RISK_PCT': 'High Risk %'
+                })
                 st.dataframe(display_df, use_container_width=True, hide_index=True)
             else:
                 st.warning("No regional data available.")
@@ -320,14 +363,19 @@ try:
                 
                 # Alert cards
                 st.markdown("### Active Fraud Alerts")
-                for _, row in fraud_df.head(5).iterrows():
-                    severity_label = "CRITICAL" if row['CONFIDENCE_PERCENTAGE'] > 80 else "HIGH" if row['CONFIDENCE_PERCENTAGE'] > 60 else "MEDIUM"
-                    st.warning(
-                        f"**{severity_label}: {row['PATTERN_DESCRIPTION']}**\n\n"
-                        f"Region: {row['REGION']} | Age Group: {row['AGE_GROUP']}\n\n"
-                        f"Affected Customers: {row['AFFECTED_CUSTOMER_COUNT']} | "
-                        f"Confidence: {row['CONFIDENCE_PERCENTAGE']}%"
-                    )
+                top_alerts = fraud_df.head(5)
+                confidence = top_alerts['CONFIDENCE_PERCENTAGE']
+                severity_labels = np.select([confidence > 80, confidence > 60], ['CRITICAL', 'HIGH'], 'MEDIUM')
+                alerts = (
+                    '**' + pd.Series(severity_labels, index=top_alerts.index) + ': '
+                    + top_alerts['PATTERN_DESCRIPTION'].astype(str) + '**\n\n'
+                    + 'Region: ' + top_alerts['REGION'].astype(str)
+                    + ' | Age Group: ' + top_alerts['AGE_GROUP'].astype(str) + '\n\n'
+                    + 'Affected Customers: ' + top_alerts['AFFECTED_CUSTOMER_COUNT'].astype(str)
+                    + ' | Confidence: ' + confidence.astype(str) + '%'
+                )
+                # One alert box for all cards rather than an element per alert
+                st.warning('\n\n---\n\n'.join(alerts.tolist()))
             else:
                 st.success("No significant fraud patterns detected in the last 30 days.")
         except Exception as e:
@@ -374,9 +422,9 @@ try:
                 
                 with col2:
                     # Bank vs Insurance risk
-                    comparison_df = occupation_df[['OCCUPATION_CATEGORY', 'AVG_BANK_RISK', 'AVG_INSURANCE_RISK']].copy()
-                    comparison_df = comparison_df.melt(id_vars='OCCUPATION_CATEGORY', var_name='Source', value_name='Risk')
-                    comparison_df['Source'] = comparison_df['Source'].str.replace('AVG_', '').str.replace('_RISK', '').str.title()
+                    comparison_df = occupation_df.rename(columns={'AVG_BANK_RISK': 'Bank', 'AVG_INSURANCE_RISK': 'Insurance'}).melt(
+                        id_vars='OCCUPATION_CATEGORY', value_vars=['Bank', 'Insurance'], var_name='Source', value_name='Risk'
+                    )
                     
                     fig = px.bar(
                         comparison_df,
@@ -392,8 +440,14 @@ try:
                 
                 # Table
                 st.markdown("### Occupation Statistics")
-                display_df = occupation_df.copy()
-                display_df.columns = ['Occupation', 'Customers', 'Avg Risk', 'Bank Risk', 'Insurance Risk', 'High Risk %']
+                display_df = occupation_df.rename(columns={
+                    'OCCUPATION_CATEGORY': 'Occupation',
+                    'TOTAL_CUSTOMERS': 'Customers',
+                    'AVG_RISK': 'Avg Risk',
+                    'AVG_BANK_RISK': 'Bank Risk',
+                    'AVG_INSURANCE_RISK': 'Insurance Risk',
+                    'HIGH_RISK_PCT': 'High Risk %'
+                })
                 st.dataframe(display_df, use_container_width=True, hide_index=True)
             else:
                 st.warning("No occupation data available.")
@@ -404,7 +458,7 @@ try:
     st.markdown("---")
     st.download_button(
         label="Export Results as CSV",
-        data=questions_df.to_csv(index=False),
+        data=export_to_csv(questions_df),
         file_name=f"crossrisk_question_{selected_question_id}_{pd.Timestamp.now().strftime('%Y%m%d')}.csv",
         mime="text/csv"
     )
@@ -1,11 +1,175 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from db_connection import run_query, is_offline_mode
+from utils import RISK_COLORS, export_to_csv
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 st.set_page_config(page_title="Risk Explorer", page_icon="📊", layout="wide")
 
+# Rows of the detailed segment table styled and sent to the browser at a time
+SEGMENT_PAGE_SIZE = 500
+
+# Cell shading for the Risk Category column; unrecognised values are shaded as LOW
+RISK_CELL_STYLES = {
+    'CRITICAL': 'background-color: #ffcccc',
+    'HIGH': 'background-color: #ffe6cc',
+    'MEDIUM': 'background-color: #ffffcc',
+    'LOW': 'background-color: #ccffcc'
+}
+
+# Chart builders are cached on their input frames and share the built figure, so a
+# rerun that leaves the filtered results unchanged skips Plotly Express and figure
+# validation entirely; callers must not modify the returned figures
+@st.cache_resource(ttl=300, show_spinner=False)
+def _score_histogram(df: pd.DataFrame) -> "go.Figure":
+    """Build the composite risk score histogram with a mean marker"""
+    import plotly.express as px
+    
+    mean_score = df['COMPOSITE_RISK_SCORE'].mean()
+    fig = px.histogram(
+        df,
+        x='COMPOSITE_RISK_SCORE',
+        nbins=20,
+        title='Risk Score Distribution',
+        color_discrete_sequence=['#1f77b4'],
+        labels={'COMPOSITE_RISK_SCORE': 'Composite Risk Score', 'count': 'Number of Segments'}
+    )
+    fig.add_vline(x=mean_score, 
+                 line_dash="dash", line_color="red",
+                 annotation_text=f"Mean: {mean_score:.2f}")
+    return fig
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def _category_pie(df: pd.DataFrame) -> "go.Figure":
+    """Build the segments by risk category pie"""
+    import plotly.express as px
+    
+    risk_cat_counts = df['RISK_CATEGORY'].value_counts().reset_index()
+    risk_cat_counts.columns = ['RISK_CATEGORY', 'COUNT']
+    
+    fig = px.pie(
+        risk_cat_counts,
+        values='COUNT',
+        names='RISK_CATEGORY',
+        title='Segments by Risk Category',
+        color='RISK_CATEGORY',
+        color_discrete_map=RISK_COLORS
+    )
+    return fig
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def _bank_vs_insurance_scatter(df: pd.DataFrame) -> "go.Figure":
+    """Build the bank vs insurance risk scatter with an equal-risk reference line
+    
+    Permissive filters can plot every segment, so points are drawn as WebGL
+    Scattergl traces; the colour split still yields one trace per risk category.
+    """
+    import plotly.express as px
+    import plotly.graph_objects as go
+    
+    fig = px.scatter(
+        df,
+        x='AVG_BANK_RISK_SCORE',
+        y='AVG_INSURANCE_RISK_SCORE',
+        color='RISK_CATEGORY',
+        size='RECORD_COUNT',
+        hover_data=['AGE_GROUP', 'REGION', 'OCCUPATION_CATEGORY'],
+        title='Banking Risk vs Insurance Risk',
+        color_discrete_map=RISK_COLORS,
+        render_mode='webgl',
+        labels={
+            'AVG_BANK_RISK_SCORE': 'Bank Risk Score',
+            'AVG_INSURANCE_RISK_SCORE': 'Insurance Risk Score'
+        }
+    )
+    # Add diagonal reference line
+    fig.add_trace(go.Scatter(
+        x=[0, 100],
+        y=[0, 100],
+        mode='lines',
+        line=dict(dash='dash', color='gray'),
+        name='Equal Risk Line',
+        showlegend=True
+    ))
+    return fig
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def _regional_bar(df: pd.DataFrame) -> "go.Figure":
+    """Build the average risk by region bar chart"""
+    import plotly.express as px
+    
+    fig = px.bar(
+        df,
+        x='REGION',
+        y='AVG_RISK',
+        color='AVG_RISK',
+        title='Average Risk by Region',
+        color_continuous_scale='RdYlGn_r',
+        labels={'AVG_RISK': 'Average Risk Score', 'REGION': 'Region'}
+    )
+    return fig
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def _regional_volume_scatter(df: pd.DataFrame) -> "go.Figure":
+    """Build the risk vs customer volume by region scatter"""
+    import plotly.express as px
+    
+    fig = px.scatter(
+        df,
+        x='CUSTOMERS',
+        y='AVG_RISK',
+        size='CUSTOMERS',
+        text='REGION',
+        title='Risk vs Customer Volume by Region',
+        labels={'CUSTOMERS': 'Number of Customers', 'AVG_RISK': 'Average Risk'}
+    )
+    fig.update_traces(textposition='top center')
+    return fig
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def _age_risk_bar(df: pd.DataFrame) -> "go.Figure":
+    """Build the grouped bank vs insurance risk by age group bar chart"""
+    import plotly.express as px
+    
+    # Relabel before melting so the series names need no string cleanup afterwards
+    melted_age = df.rename(columns={'AVG_BANK_RISK': 'Bank', 'AVG_INSURANCE_RISK': 'Insurance'}).melt(
+        id_vars=['AGE_GROUP', 'CUSTOMERS'],
+        value_vars=['Bank', 'Insurance'],
+        var_name='Risk Type',
+        value_name='Risk Score'
+    )
+    
+    fig = px.bar(
+        melted_age,
+        x='AGE_GROUP',
+        y='Risk Score',
+        color='Risk Type',
+        barmode='group',
+        title='Bank vs Insurance Risk by Age Group',
+        labels={'AGE_GROUP': 'Age Group', 'Risk Score': 'Average Risk Score'}
+    )
+    return fig
+
+@st.cache_resource(ttl=300, show_spinner=False)
+def _occupation_bar(df: pd.DataFrame) -> "go.Figure":
+    """Build the horizontal average risk by occupation bar chart"""
+    import plotly.express as px
+    
+    fig = px.bar(
+        df,
+        y='OCCUPATION',
+        x='AVG_RISK',
+        orientation='h',
+        color='AVG_RISK',
+        title='Average Risk by Occupation',
+        color_continuous_scale='RdYlGn_r',
+        labels={'AVG_RISK': 'Average Risk Score', 'OCCUPATION': 'Occupation'}
+    )
+    return fig
+
 st.title("Risk Explorer")
 
 st.markdown("""
@@ -21,17 +185,31 @@ st.markdown("---")
 # Sidebar filters
 st.sidebar.title("Filter Options")
 
-# Get available filter values
-age_groups_query = "SELECT DISTINCT age_group FROM ANALYTICS.risk_join_aggregated ORDER BY age_group"
-regions_query = "SELECT DISTINCT region FROM ANALYTICS.risk_join_aggregated ORDER BY region"
-occupations_query = "SELECT DISTINCT occupation_category FROM ANALYTICS.risk_join_aggregated WHERE occupation_category IS NOT NULL ORDER BY occupation_category"
-risk_categories_query = "SELECT DISTINCT risk_category FROM ANALYTICS.risk_join_aggregated ORDER BY CASE risk_category WHEN 'CRITICAL' THEN 1 WHEN 'HIGH' THEN 2 WHEN 'MEDIUM' THEN 3 WHEN 'LOW' THEN 4 END"
+# Get available filter values: one round-trip returning a row per distinct value
+filter_options_query = """
+SELECT DISTINCT 'AGE_GROUP' AS filter_name, age_group AS filter_value, 0 AS sort_order
+FROM ANALYTICS.risk_join_aggregated
+UNION ALL
+SELECT DISTINCT 'REGION', region, 0
+FROM ANALYTICS.risk_join_aggregated
+UNION ALL
+SELECT DISTINCT 'OCCUPATION_CATEGORY', occupation_category, 0
+FROM ANALYTICS.risk_join_aggregated
+WHERE occupation_category IS NOT NULL
+UNION ALL
+SELECT DISTINCT 'RISK_CATEGORY', risk_category,
+    CASE risk_category WHEN 'CRITICAL' THEN 1 WHEN 'HIGH' THEN 2 WHEN 'MEDIUM' THEN 3 WHEN 'LOW' THEN 4 END
+FROM ANALYTICS.risk_join_aggregated
+ORDER BY filter_name, sort_order, filter_value
+"""
 
 try:
-    age_groups = run_query(age_groups_query)['AGE_GROUP'].tolist()
-    regions = run_query(regions_query)['REGION'].tolist()
-    occupations = run_query(occupations_query)['OCCUPATION_CATEGORY'].tolist()
-    risk_categories = run_query(risk_categories_query)['RISK_CATEGORY'].tolist()
+    filter_options = run_query(filter_options_query)
+    options_by_filter = filter_options.groupby('FILTER_NAME', sort=False)['FILTER_VALUE'].agg(list)
+    age_groups = options_by_filter.get('AGE_GROUP', [])
+    regions = options_by_filter.get('REGION', [])
+    occupations = options_by_filter.get('OCCUPATION_CATEGORY', [])
+    risk_categories = options_by_filter.get('RISK_CATEGORY', [])
     
     # Filter controls
     selected_age_groups = st.sidebar.multiselect(
@@ -82,27 +260,31 @@ try:
         help="Privacy filter: only show segments with at least this many customers"
     )
     
-    # Build dynamic query with filters
+    # Build dynamic query with filters; selections are bound as parameters
+    # rather than spliced into the SQL text
     filters = []
+    params = {}
     
     if selected_age_groups:
-        age_filter = "', '".join(selected_age_groups)
-        filters.append(f"age_group IN ('{age_filter}')")
+        filters.append("age_group IN (%(age_groups)s)")
+        params['age_groups'] = selected_age_groups
     
     if selected_regions:
-        region_filter = "', '".join(selected_regions)
-        filters.append(f"region IN ('{region_filter}')")
+        filters.append("region IN (%(regions)s)")
+        params['regions'] = selected_regions
     
     if selected_occupations:
-        occupation_filter = "', '".join(selected_occupations)
-        filters.append(f"occupation_category IN ('{occupation_filter}')")
+        filters.append("occupation_category IN (%(occupations)s)")
+        params['occupations'] = selected_occupations
     
     if selected_risk_categories:
-        risk_cat_filter = "', '".join(selected_risk_categories)
-        filters.append(f"risk_category IN ('{risk_cat_filter}')")
+        filters.append("risk_category IN (%(risk_categories)s)")
+        params['risk_categories'] = selected_risk_categories
     
-    filters.append(f"composite_risk_score BETWEEN {risk_score_range[0]} AND {risk_score_range[1]}")
-    filters.append(f"record_count >= {min_customers}")
+    filters.append("composite_risk_score BETWEEN %(min_score)s AND %(max_score)s")
+    params['min_score'], params['max_score'] = risk_score_range
+    filters.append("record_count >= %(min_customers)s")
+    params['min_customers'] = min_customers
     
     where_clause = " AND ".join(filters)
     
@@ -125,7 +307,7 @@ try:
     """
     
     try:
-        results_df = run_query(main_query)
+        results_df = run_query(main_query, params=params)
         
         if results_df.empty:
             st.warning("No segments match the selected filters. Try adjusting your criteria.")
@@ -146,7 +328,7 @@ try:
             st.metric("Average Risk Score", f"{results_df['COMPOSITE_RISK_SCORE'].mean():.2f}")
         
         with col4:
-            high_risk_count = results_df[results_df['RISK_CATEGORY'].isin(['HIGH', 'CRITICAL'])]['RECORD_COUNT'].sum()
+            high_risk_count = results_df.loc[results_df['RISK_CATEGORY'].isin(['HIGH', 'CRITICAL']), 'RECORD_COUNT'].sum()
             st.metric("High Risk Customers", f"{high_risk_count:,}")
         
         st.markdown("---")
@@ -161,75 +343,20 @@ try:
             
             with col1:
                 # Histogram of risk scores
-                fig = px.histogram(
-                    results_df,
-                    x='COMPOSITE_RISK_SCORE',
-                    nbins=20,
-                    title='Risk Score Distribution',
-                    color_discrete_sequence=['#1f77b4'],
-                    labels={'COMPOSITE_RISK_SCORE': 'Composite Risk Score', 'count': 'Number of Segments'}
-                )
-                fig.add_vline(x=results_df['COMPOSITE_RISK_SCORE'].mean(), 
-                             line_dash="dash", line_color="red",
-                             annotation_text=f"Mean: {results_df['COMPOSITE_RISK_SCORE'].mean():.2f}")
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(_score_histogram(results_df), use_container_width=True)
             
             with col2:
                 # Risk category pie chart
-                risk_cat_counts = results_df['RISK_CATEGORY'].value_counts().reset_index()
-                risk_cat_counts.columns = ['RISK_CATEGORY', 'COUNT']
-                
-                fig = px.pie(
-                    risk_cat_counts,
-                    values='COUNT',
-                    names='RISK_CATEGORY',
-                    title='Segments by Risk Category',
-                    color='RISK_CATEGORY',
-                    color_discrete_map={
-                        'CRITICAL': '#d62728',
-                        'HIGH': '#ff7f0e',
-                        'MEDIUM': '#ffbb78',
-                        'LOW': '#2ca02c'
-                    }
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(_category_pie(results_df), use_container_width=True)
             
             # Bank vs Insurance risk scatter
             st.markdown("### Bank vs Insurance Risk Comparison")
-            fig = px.scatter(
-                results_df,
-                x='AVG_BANK_RISK_SCORE',
-                y='AVG_INSURANCE_RISK_SCORE',
-                color='RISK_CATEGORY',
-                size='RECORD_COUNT',
-                hover_data=['AGE_GROUP', 'REGION', 'OCCUPATION_CATEGORY'],
-                title='Banking Risk vs Insurance Risk',
-                color_discrete_map={
-                    'CRITICAL': '#d62728',
-                    'HIGH': '#ff7f0e',
-                    'MEDIUM': '#ffbb78',
-                    'LOW': '#2ca02c'
-                },
-                labels={
-                    'AVG_BANK_RISK_SCORE': 'Bank Risk Score',
-                    'AVG_INSURANCE_RISK_SCORE': 'Insurance Risk Score'
-                }
-            )
-            # Add diagonal reference line
-            fig.add_trace(go.Scatter(
-                x=[0, 100],
-                y=[0, 100],
-                mode='lines',
-                line=dict(dash='dash', color='gray'),
-                name='Equal Risk Line',
-                showlegend=True
-            ))
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(_bank_vs_insurance_scatter(results_df), use_container_width=True)
         
         with tab2:
             st.subheader("Regional Risk Analysis")
             
-            regional_summary = results_df.groupby('REGION').agg({
+            regional_summary = results_df.groupby('REGION', observed=True).agg({
                 'RECORD_COUNT': 'sum',
                 'COMPOSITE_RISK_SCORE': 'mean',
                 'FRAUD_CORRELATION_SCORE': 'mean'
@@ -240,36 +367,17 @@ try:
             col1, col2 = st.columns(2)
             
             with col1:
-                fig = px.bar(
-                    regional_summary,
-                    x='REGION',
-                    y='AVG_RISK',
-                    color='AVG_RISK',
-                    title='Average Risk by Region',
-                    color_continuous_scale='RdYlGn_r',
-                    labels={'AVG_RISK': 'Average Risk Score', 'REGION': 'Region'}
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(_regional_bar(regional_summary), use_container_width=True)
             
             with col2:
-                fig = px.scatter(
-                    regional_summary,
-                    x='CUSTOMERS',
-                    y='AVG_RISK',
-                    size='CUSTOMERS',
-                    text='REGION',
-                    title='Risk vs Customer Volume by Region',
-                    labels={'CUSTOMERS': 'Number of Customers', 'AVG_RISK': 'Average Risk'}
-                )
-                fig.update_traces(textposition='top center')
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(_regional_volume_scatter(regional_summary), use_container_width=True)
             
             st.dataframe(regional_summary, use_container_width=True, hide_index=True)
         
         with tab3:
             st.subheader("Age Group Analysis")
             
-            age_summary = results_df.groupby('AGE_GROUP').agg({
+            age_summary = results_df.groupby('AGE_GROUP', observed=True).agg({
                 'RECORD_COUNT': 'sum',
                 'COMPOSITE_RISK_SCORE': 'mean',
                 'AVG_BANK_RISK_SCORE': 'mean',
@@ -279,31 +387,14 @@ try:
             age_summary = age_summary.round(2)
             
             # Grouped bar chart
-            melted_age = age_summary.melt(
-                id_vars=['AGE_GROUP', 'CUSTOMERS'],
-                value_vars=['AVG_BANK_RISK', 'AVG_INSURANCE_RISK'],
-                var_name='Risk Type',
-                value_name='Risk Score'
-            )
-            melted_age['Risk Type'] = melted_age['Risk Type'].str.replace('AVG_', '').str.replace('_RISK', '').str.title()
-            
-            fig = px.bar(
-                melted_age,
-                x='AGE_GROUP',
-                y='Risk Score',
-                color='Risk Type',
-                barmode='group',
-                title='Bank vs Insurance Risk by Age Group',
-                labels={'AGE_GROUP': 'Age Group', 'Risk Score': 'Average Risk Score'}
-            )
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(_age_risk_bar(age_summary), use_container_width=True)
             
             st.dataframe(age_summary, use_container_width=True, hide_index=True)
         
         with tab4:
             st.subheader("Occupation Analysis")
             
-            occupation_summary = results_df.groupby('OCCUPATION_CATEGORY').agg({
+            occupation_summary = results_df.groupby('OCCUPATION_CATEGORY', observed=True).agg({
                 'RECORD_COUNT': 'sum',
                 'COMPOSITE_RISK_SCORE': 'mean',
                 'FRAUD_CORRELATION_SCORE': 'mean'
@@ -314,26 +405,16 @@ try:
             col1, col2 = st.columns([2, 1])
             
             with col1:
-                fig = px.bar(
-                    occupation_summary,
-                    y='OCCUPATION',
-                    x='AVG_RISK',
-                    orientation='h',
-                    color='AVG_RISK',
-                    title='Average Risk by Occupation',
-                    color_continuous_scale='RdYlGn_r',
-                    labels={'AVG_RISK': 'Average Risk Score', 'OCCUPATION': 'Occupation'}
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(_occupation_bar(occupation_summary), use_container_width=True)
             
             with col2:
                 st.markdown("### Top 5 Highest Risk")
-                for _, row in occupation_summary.head(5).iterrows():
-                    st.metric(
-                        row['OCCUPATION'],
-                        f"{row['AVG_RISK']:.2f}",
-                        f"{row['CUSTOMERS']} customers"
-                    )
+                top_occupations = occupation_summary.head(5)
+                labels = top_occupations['OCCUPATION'].tolist()
+                values = top_occupations['AVG_RISK'].map('{:.2f}'.format).tolist()
+                deltas = (top_occupations['CUSTOMERS'].astype(str) + ' customers').tolist()
+                for label, value, delta in zip(labels, values, deltas):
+                    st.metric(label, value, delta)
             
             st.dataframe(occupation_summary, use_container_width=True, hide_index=True)
         
@@ -343,29 +424,42 @@ try:
         st.subheader("Detailed Segment Data")
         
         # Format for display
-        display_df = results_df.copy()
-        display_df = display_df.drop('ANALYSIS_ID', axis=1)
-        display_df.columns = ['Age Group', 'Region', 'Occupation', 'Customers', 'Risk Score', 
-                              'Risk Category', 'Bank Risk', 'Insurance Risk', 'Fraud Correlation']
+        display_df = results_df.drop(columns='ANALYSIS_ID').rename(columns={
+            'AGE_GROUP': 'Age Group',
+            'REGION': 'Region',
+            'OCCUPATION_CATEGORY': 'Occupation',
+            'RECORD_COUNT': 'Customers',
+            'COMPOSITE_RISK_SCORE': 'Risk Score',
+            'RISK_CATEGORY': 'Risk Category',
+            'AVG_BANK_RISK_SCORE': 'Bank Risk',
+            'AVG_INSURANCE_RISK_SCORE': 'Insurance Risk',
+            'FRAUD_CORRELATION_SCORE': 'Fraud Correlation'
+        })
+        
+        # Color code risk categories with one lookup per column rather than a call per cell
+        def color_risk(column):
+            return column.astype(object).map(RISK_CELL_STYLES).fillna(RISK_CELL_STYLES['LOW'])
         
-        # Color code risk categories
-        def color_risk(val):
-            if val == 'CRITICAL':
-                return 'background-color: #ffcccc'
-            elif val == 'HIGH':
-                return 'background-color: #ffe6cc'
-            elif val == 'MEDIUM':
-                return 'background-color: #ffffcc'
-            else:
-                return 'background-color: #ccffcc'
+        # Only the visible page is styled; the export below still covers every row
+        page_count = -(-len(display_df) // SEGMENT_PAGE_SIZE)
+        page = 1
+        if page_count > 1:
+            page = st.number_input(
+                "Page",
+                min_value=1,
+                max_value=page_count,
+                value=1,
+                help=f"{len(display_df):,} segments, {SEGMENT_PAGE_SIZE} per page"
+            )
+        page_df = display_df.iloc[(page - 1) * SEGMENT_PAGE_SIZE:page * SEGMENT_PAGE_SIZE]
         
-        styled_df = display_df.style.applymap(color_risk, subset=['Risk Category'])
+        styled_df = page_df.style.apply(color_risk, subset=['Risk Category'])
         st.dataframe(styled_df, use_container_width=True, hide_index=True)
         
         # Export option
         st.download_button(
             label="Export Filtered Data as CSV",
-            data=display_df.to_csv(index=False),
+            data=export_to_csv(display_df),
             file_name=f"crossrisk_filtered_segments_{pd.Timestamp.now().strftime('%Y%m%d_%H%M')}.csv",
             mime="text/csv"
         )
@@ -378,16 +472,21 @@ try:
             with st.spinner("Generating AI analysis..."):
                 top_segment = results_df.iloc[0]
                 
-                ai_query = f"""
+                ai_query = """
                 SELECT explain_risk_anomaly(
-                    '{top_segment['AGE_GROUP']}',
-                    '{top_segment['REGION']}',
-                    {top_segment['COMPOSITE_RISK_SCORE']}
+                    %(age_group)s,
+                    %(region)s,
+                    %(risk_score)s
                 ) as explanation
                 """
+                ai_params = {
+                    'age_group': str(top_segment['AGE_GROUP']),
+                    'region': str(top_segment['REGION']),
+                    'risk_score': float(top_segment['COMPOSITE_RISK_SCORE'])
+                }
                 
                 try:
-                    ai_result = run_query(ai_query)
+                    ai_result = run_query(ai_query, params=ai_params)
                     if not ai_result.empty:
                         st.info(f"**AI Analysis for {top_segment['AGE_GROUP']} in {top_segment['REGION']}:**\n\n{ai_result['EXPLANATION'].values[0]}")
                     else:
@@ -3,6 +3,7 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from db_connection import run_query, is_offline_mode
+from utils import export_to_csv
 
 st.set_page_config(page_title="Organization Comparison", page_icon="📊", layout="wide")
 
@@ -76,7 +77,7 @@ try:
         # Side-by-side comparison chart
         st.markdown("### Risk Score Comparison")
         
-        comparison_metrics = overview_df[['ORGANIZATION', 'AVG_RISK_SCORE', 'MIN_RISK', 'MAX_RISK']].copy()
+        comparison_metrics = overview_df[['ORGANIZATION', 'AVG_RISK_SCORE', 'MIN_RISK', 'MAX_RISK']]
         
         fig = go.Figure()
         
@@ -132,13 +133,12 @@ try:
         
         with col1:
             # Grouped bar chart
-            regional_melted = regional_df.melt(
+            regional_melted = regional_df.rename(columns={'BANK_AVG_RISK': 'Bank', 'INSURANCE_AVG_RISK': 'Insurance'}).melt(
                 id_vars=['REGION', 'CUSTOMER_COUNT'],
-                value_vars=['BANK_AVG_RISK', 'INSURANCE_AVG_RISK'],
+                value_vars=['Bank', 'Insurance'],
                 var_name='Organization',
                 value_name='Avg Risk'
             )
-            regional_melted['Organization'] = regional_melted['Organization'].str.replace('_AVG_RISK', '').str.replace('_', ' ').str.title()
             
             fig = px.bar(
                 regional_melted,
@@ -168,8 +168,13 @@ try:
         
         # Regional table
         st.markdown("### Regional Statistics")
-        display_regional = regional_df.copy()
-        display_regional.columns = ['Region', 'Bank Avg Risk', 'Insurance Avg Risk', 'Customers', 'Difference']
+        display_regional = regional_df.rename(columns={
+            'REGION': 'Region',
+            'BANK_AVG_RISK': 'Bank Avg Risk',
+            'INSURANCE_AVG_RISK': 'Insurance Avg Risk',
+            'CUSTOMER_COUNT': 'Customers',
+            'RISK_DIFFERENCE': 'Difference'
+        })
         st.dataframe(display_regional, use_container_width=True, hide_index=True)
 
 except Exception as e:
@@ -235,8 +240,13 @@ try:
         # Age group table with insights
         st.markdown("### Age Group Analysis")
         
-        display_age = age_df.copy()
-        display_age.columns = ['Age Group', 'Bank Risk', 'Insurance Risk', 'Customers', 'Risk Gap']
+        display_age = age_df.rename(columns={
+            'AGE_GROUP': 'Age Group',
+            'BANK_AVG_RISK': 'Bank Risk',
+            'INSURANCE_AVG_RISK': 'Insurance Risk',
+            'CUSTOMER_COUNT': 'Customers',
+            'RISK_GAP': 'Risk Gap'
+        })
         
         # Add insight column
         display_age['Primary Risk Driver'] = display_age.apply(
@@ -411,8 +421,12 @@ try:
         
         # Summary table
         st.markdown("### Risk Driver Distribution")
-        display_composite = composite_df.copy()
-        display_composite.columns = ['Risk Category', 'Risk Driver', 'Segments', 'Customers']
+        display_composite = composite_df.rename(columns={
+            'COMPOSITE_RISK_CATEGORY': 'Risk Category',
+            'RISK_DRIVER': 'Risk Driver',
+            'SEGMENT_COUNT': 'Segments',
+            'CUSTOMER_COUNT': 'Customers'
+        })
         st.dataframe(display_composite, use_container_width=True, hide_index=True)
         
         # Key insights
@@ -458,7 +472,7 @@ try:
         with col1:
             st.download_button(
                 label="Export Regional Comparison",
-                data=display_regional.to_csv(index=False),
+                data=export_to_csv(display_regional),
                 file_name=f"crossrisk_regional_comparison_{pd.Timestamp.now().strftime('%Y%m%d')}.csv",
                 mime="text/csv"
             )
@@ -467,7 +481,7 @@ try:
             if 'display_age' in locals() and not display_age.empty:
                 st.download_button(
                     label="Export Age Group Comparison",
-                    data=display_age.to_csv(index=False),
+                    data=export_to_csv(display_age),
                     file_name=f"crossrisk_age_comparison_{pd.Timestamp.now().strftime('%Y%m%d')}.csv",
                     mime="text/csv"
                 )
@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
 from db_connection import run_query, is_offline_mode
+from utils import export_to_csv
+from charts import ts_line
 
 st.set_page_config(page_title="Governance & Audit", page_icon="📊", layout="wide")
 
@@ -136,15 +137,18 @@ with col3:
         index=0
     )
 
-# Build filtered query
-where_clauses = [f"checked_at >= DATEADD(day, -{days_back}, CURRENT_TIMESTAMP())"]
+# Build filtered query; check types come from query results, so filter
+# values are bound as parameters rather than quoted into the SQL text
+where_clauses = ["checked_at >= DATEADD(day, -%(days_back)s, CURRENT_TIMESTAMP())"]
+log_params = {'days_back': days_back}
 
 if 'All' not in check_type_filter and check_type_filter:
-    types_str = "', '".join(check_type_filter)
-    where_clauses.append(f"check_type IN ('{types_str}')")
+    where_clauses.append("check_type IN (%(check_types)s)")
+    log_params['check_types'] = check_type_filter
 
 if result_filter != 'All':
-    where_clauses.append(f"check_result = '{result_filter}'")
+    where_clauses.append("check_result = %(check_result)s")
+    log_params['check_result'] = result_filter
 
 where_clause = " AND ".join(where_clauses)
 
@@ -163,14 +167,18 @@ LIMIT 100
 """
 
 try:
-    log_df = run_query(log_query)
+    log_df = run_query(log_query, params=log_params)
     
     if not log_df.empty:
         # Format for display
-        display_log = log_df.copy()
-        display_log['CHECKED_AT'] = pd.to_datetime(display_log['CHECKED_AT']).dt.strftime('%Y-%m-%d %H:%M:%S')
-        display_log = display_log[['CHECKED_AT', 'CHECK_TYPE', 'CHECK_RESULT', 'TABLE_NAME', 'DETAILS']]
-        display_log.columns = ['Timestamp', 'Check Type', 'Result', 'Table', 'Details']
+        display_log = log_df[['CHECKED_AT', 'CHECK_TYPE', 'CHECK_RESULT', 'TABLE_NAME', 'DETAILS']].rename(columns={
+            'CHECKED_AT': 'Timestamp',
+            'CHECK_TYPE': 'Check Type',
+            'CHECK_RESULT': 'Result',
+            'TABLE_NAME': 'Table',
+            'DETAILS': 'Details'
+        })
+        display_log['Timestamp'] = pd.to_datetime(display_log['Timestamp']).dt.strftime('%Y-%m-%d %H:%M:%S')
         
         # Color code results
         def color_result(val):
@@ -188,7 +196,7 @@ try:
         # Export log
         st.download_button(
             label="Export Compliance Log",
-            data=display_log.to_csv(index=False),
+            data=export_to_csv(display_log),
             file_name=f"crossrisk_compliance_log_{pd.Timestamp.now().strftime('%Y%m%d')}.csv",
             mime="text/csv"
         )
@@ -285,11 +293,12 @@ try:
         
         with col2:
             # Table view
-            display_user = user_access_df.copy()
-            display_user['FIRST_ACCESS'] = pd.to_datetime(display_user['FIRST_ACCESS']).dt.strftime('%Y-%m-%d')
-            display_user['LAST_ACCESS'] = pd.to_datetime(display_user['LAST_ACCESS']).dt.strftime('%Y-%m-%d')
-            display_user = display_user[['USER_NAME', 'ROLE_NAME', 'QUERY_COUNT', 'ROWS_ACCESSED']]
-            display_user.columns = ['User', 'Role', 'Queries', 'Rows Accessed']
+            display_user = user_access_df[['USER_NAME', 'ROLE_NAME', 'QUERY_COUNT', 'ROWS_ACCESSED']].rename(columns={
+                'USER_NAME': 'User',
+                'ROLE_NAME': 'Role',
+                'QUERY_COUNT': 'Queries',
+                'ROWS_ACCESSED': 'Rows Accessed'
+            })
             
             st.dataframe(display_user, use_container_width=True, hide_index=True, height=400)
     else:
@@ -320,25 +329,21 @@ try:
     
     if not timeline_df.empty:
         # Line chart
-        fig = go.Figure()
-        
-        fig.add_trace(go.Scatter(
-            x=timeline_df['ACCESS_DATE'],
-            y=timeline_df['QUERY_COUNT'],
+        fig = ts_line(
+            timeline_df, 'ACCESS_DATE', 'QUERY_COUNT',
             mode='lines+markers',
             name='Query Count',
             line=dict(color='#1f77b4', width=2),
             yaxis='y'
-        ))
+        )
         
-        fig.add_trace(go.Scatter(
-            x=timeline_df['ACCESS_DATE'],
-            y=timeline_df['UNIQUE_USERS'],
+        ts_line(
+            timeline_df, 'ACCESS_DATE', 'UNIQUE_USERS', fig=fig,
             mode='lines+markers',
             name='Unique Users',
             line=dict(color='#ff7f0e', width=2),
             yaxis='y2'
-        ))
+        )
         
         fig.update_layout(
             title='Access Activity Timeline (Last 30 Days)',
@@ -559,7 +564,7 @@ if st.button("Generate Full Audit Report"):
                 # Download report
                 st.download_button(
                     label="Download Complete Audit Report",
-                    data=report_df.to_csv(index=False),
+                    data=export_to_csv(report_df),
                     file_name=f"crossrisk_audit_report_{report_start_date}_{report_end_date}.csv",
                     mime="text/csv"
                 )
@@ -4,12 +4,40 @@ Provides database connection helpers, data formatting, and visualization utiliti
 """
 
 import streamlit as st
+import numpy as np
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator, TYPE_CHECKING
+import copy
+import functools
 import json
 
+# Plotly is imported inside the chart helpers so pages that only format data don't pay for it
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+# Lower bounds of the MEDIUM, HIGH and CRITICAL score bands
+_RISK_THRESHOLDS = np.array([25.0, 50.0, 75.0])
+_RISK_BANDS = ('LOW', 'MEDIUM', 'HIGH', 'CRITICAL')
+_RISK_BAND_COLORS = np.array(['#2ca02c', '#ffbb78', '#ff7f0e', '#d62728'])
+
+# Heatmaps over more rows than this bin numeric axes to at most HEATMAP_BINS cells each
+HEATMAP_BIN_ROWS = 50_000
+HEATMAP_BINS = 200
+
+def _risk_band_codes(scores: np.ndarray) -> np.ndarray:
+    """Index into _RISK_BANDS for each score; missing scores fall in LOW"""
+    # side='right' puts a score equal to a threshold in the band it starts
+    bands = np.searchsorted(_RISK_THRESHOLDS, scores, side='right')
+    bands[np.isnan(scores)] = 0
+    return bands
+
+def _risk_band_counts(scores: np.ndarray) -> Dict[str, int]:
+    """Count scores per risk band, keyed LOW to CRITICAL"""
+    counts = np.bincount(_risk_band_codes(scores), minlength=len(_RISK_BANDS))
+    return {band: int(count) for band, count in zip(_RISK_BANDS, counts)}
+
+# Dashboard scores repeat heavily, so the formatted HTML is memoized per score
+@functools.lru_cache(maxsize=1024)
 def format_risk_score(score: float) -> str:
     """
     Format risk score with color coding.
@@ -35,24 +63,37 @@ def format_risk_score(score: float) -> str:
     
     return f'<span style="color: {color}; font-weight: bold;">{score:.2f} ({category})</span>'
 
-def create_risk_gauge(score: float, title: str = "Risk Score") -> go.Figure:
+def format_risk_score_series(scores: pd.Series) -> pd.Series:
     """
-    Create a gauge chart for risk score visualization.
+    Format a column of risk scores with color coding.
+    
+    Produces the same HTML as format_risk_score for every element, without a
+    Python call per row.
     
     Args:
-        score: Risk score value (0-100)
-        title: Chart title
+        scores: Series of risk score values (0-100)
     
     Returns:
-        Plotly figure object
+        Series of HTML formatted strings with the same index as scores
     """
-    fig = go.Figure(go.Indicator(
-        mode="gauge+number+delta",
-        value=score,
-        domain={'x': [0, 1], 'y': [0, 1]},
-        title={'text': title},
-        delta={'reference': 50},
-        gauge={
+    values = scores.to_numpy(dtype=np.float64, na_value=np.nan)
+    codes = _risk_band_codes(values)
+    categories = np.array(_RISK_BANDS)[codes]
+    html = ('<span style="color: ' + _RISK_BAND_COLORS[codes].astype(object) + '; font-weight: bold;">'
+            + np.char.mod('%.2f', values).astype(object) + ' (' + categories.astype(object) + ')</span>')
+    return pd.Series(html, index=scores.index, dtype=object)
+
+# Everything in the gauge except its value and title; copied and patched per call
+# so Plotly's validators only run once, when the figure is wrapped
+_GAUGE_FIG_DICT = {
+    'data': [{
+        'type': 'indicator',
+        'mode': 'gauge+number+delta',
+        'value': 0,
+        'domain': {'x': [0, 1], 'y': [0, 1]},
+        'title': {'text': ''},
+        'delta': {'reference': 50},
+        'gauge': {
             'axis': {'range': [None, 100]},
             'bar': {'color': "darkblue"},
             'steps': [
@@ -67,10 +108,27 @@ def create_risk_gauge(score: float, title: str = "Risk Score") -> go.Figure:
                 'value': 75
             }
         }
-    ))
+    }],
+    'layout': {'height': 300}
+}
+
+def create_risk_gauge(score: float, title: str = "Risk Score") -> "go.Figure":
+    """
+    Create a gauge chart for risk score visualization.
+    
+    Args:
+        score: Risk score value (0-100)
+        title: Chart title
+    
+    Returns:
+        Plotly figure object
+    """
+    import plotly.graph_objects as go
     
-    fig.update_layout(height=300)
-    return fig
+    fig_dict = copy.deepcopy(_GAUGE_FIG_DICT)
+    fig_dict['data'][0]['value'] = score
+    fig_dict['data'][0]['title']['text'] = title
+    return go.Figure(fig_dict)
 
 def create_trend_indicator(current: float, previous: float, 
                           label: str = "Change") -> str:
@@ -121,6 +179,37 @@ def format_large_number(num: int) -> str:
     else:
         return str(num)
 
+# Lower bounds of the K, M and B suffixes used by format_large_number
+_NUMBER_SCALES = np.array([1e3, 1e6, 1e9])
+_NUMBER_SUFFIXES = np.array(['', 'K', 'M', 'B'], dtype=object)
+
+def format_large_numbers(nums: pd.Series) -> pd.Series:
+    """
+    Format a column of numbers with K, M, B suffixes.
+    
+    Produces the same strings as format_large_number for every element,
+    without a Python call per row.
+    
+    Args:
+        nums: Series of numbers to format
+    
+    Returns:
+        Series of formatted strings with the same index as nums
+    """
+    values = nums.to_numpy(dtype=np.float64, na_value=np.nan)
+    codes = np.searchsorted(_NUMBER_SCALES, values, side='right')
+    codes[np.isnan(values)] = 0
+    divisors = np.concatenate(([1.0], _NUMBER_SCALES))[codes]
+    scaled = np.char.mod('%.1f', values / divisors).astype(object) + _NUMBER_SUFFIXES[codes]
+    # Below 1,000 the number is shown as is
+    unscaled = codes == 0
+    scaled[unscaled] = nums.astype(object).to_numpy()[unscaled].astype(str)
+    return pd.Series(scaled, index=nums.index, dtype=object)
+
+_PRIVACY_WARNING_BADGE = '<span style="background-color: #d62728; color: white; padding: 3px 8px; border-radius: 3px;">WARNING - Below k-anonymity threshold</span>'
+
+# Segment sizes repeat across reruns, so the badge HTML is memoized per (size, k)
+@functools.lru_cache(maxsize=256)
 def create_privacy_badge(segment_size: int, min_k: int = 3) -> str:
     """
     Create a privacy compliance badge for segment size.
@@ -135,7 +224,28 @@ def create_privacy_badge(segment_size: int, min_k: int = 3) -> str:
     if segment_size >= min_k:
         return f'<span style="background-color: #2ca02c; color: white; padding: 3px 8px; border-radius: 3px;">COMPLIANT - Privacy Protected (k={segment_size})</span>'
     else:
-        return f'<span style="background-color: #d62728; color: white; padding: 3px 8px; border-radius: 3px;">WARNING - Below k-anonymity threshold</span>'
+        return _PRIVACY_WARNING_BADGE
+
+def create_privacy_badges(segment_sizes: pd.Series, min_k: int = 3) -> pd.Series:
+    """
+    Create privacy compliance badges for a column of segment sizes.
+    
+    Produces the same HTML as create_privacy_badge for every element, without
+    a Python call per row.
+    
+    Args:
+        segment_sizes: Series of customer counts per segment
+        min_k: Minimum k for k-anonymity
+    
+    Returns:
+        Series of HTML formatted badges with the same index as segment_sizes
+    """
+    sizes = segment_sizes.astype(object).to_numpy()
+    compliant = segment_sizes.to_numpy(dtype=np.float64, na_value=np.nan) >= min_k
+    badges = np.full(len(sizes), _PRIVACY_WARNING_BADGE, dtype=object)
+    badges[compliant] = ('<span style="background-color: #2ca02c; color: white; padding: 3px 8px; border-radius: 3px;">COMPLIANT - Privacy Protected (k='
+                         + sizes[compliant].astype(str).astype(object) + ')</span>')
+    return pd.Series(badges, index=segment_sizes.index, dtype=object)
 
 def calculate_risk_distribution(df: pd.DataFrame, 
                                 risk_column: str = 'COMPOSITE_RISK_SCORE') -> Dict[str, int]:
@@ -149,24 +259,7 @@ def calculate_risk_distribution(df: pd.DataFrame,
     Returns:
         Dictionary with risk category counts
     """
-    distribution = {
-        'LOW': 0,
-        'MEDIUM': 0,
-        'HIGH': 0,
-        'CRITICAL': 0
-    }
-    
-    for score in df[risk_column]:
-        if score >= 75:
-            distribution['CRITICAL'] += 1
-        elif score >= 50:
-            distribution['HIGH'] += 1
-        elif score >= 25:
-            distribution['MEDIUM'] += 1
-        else:
-            distribution['LOW'] += 1
-    
-    return distribution
+    return _risk_band_counts(df[risk_column].to_numpy(dtype=np.float64, na_value=np.nan))
 
 def create_comparison_table(org1_data: Dict, org2_data: Dict, 
                            org1_name: str = "Organization 1",
@@ -183,10 +276,11 @@ def create_comparison_table(org1_data: Dict, org2_data: Dict,
     Returns:
         Comparison DataFrame
     """
+    # org2 values follow org1's metric order rather than its own insertion order
     comparison = pd.DataFrame({
-        'Metric': list(org1_data.keys()),
+        'Metric': list(org1_data),
         org1_name: list(org1_data.values()),
-        org2_name: list(org2_data.values())
+        org2_name: [org2_data.get(metric) for metric in org1_data]
     })
     
     return comparison
@@ -207,7 +301,10 @@ def apply_k_anonymity_filter(df: pd.DataFrame,
     Returns:
         Filtered DataFrame meeting k-anonymity requirement
     """
-    return df[df[count_column] >= min_k].copy()
+    # Boolean indexing already returns a new frame, and under copy-on-write
+    # edits to it never reach df, so no extra .copy() is needed
+    counts = df[count_column].to_numpy(dtype=np.float64, na_value=np.nan)
+    return df.loc[counts >= min_k]
 
 def generate_risk_summary(df: pd.DataFrame) -> str:
     """
@@ -221,9 +318,12 @@ def generate_risk_summary(df: pd.DataFrame) -> str:
     """
     total_segments = len(df)
     total_customers = df['RECORD_COUNT'].sum() if 'RECORD_COUNT' in df.columns else 0
-    avg_risk = df['COMPOSITE_RISK_SCORE'].mean() if 'COMPOSITE_RISK_SCORE' in df.columns else 0
     
-    distribution = calculate_risk_distribution(df)
+    # Extract the scores once; the average and the band counts both read this array
+    scores = df['COMPOSITE_RISK_SCORE'].to_numpy(dtype=np.float64, na_value=np.nan)
+    present = scores[~np.isnan(scores)]
+    avg_risk = present.mean() if len(present) else np.nan
+    distribution = _risk_band_counts(scores)
     
     summary = f"""
     **Risk Analytics Summary**
@@ -253,11 +353,52 @@ def export_to_json(df: pd.DataFrame, filename: str = "export.json") -> str:
     """
     return df.to_json(orient='records', indent=2)
 
+def export_to_json_iter(df: pd.DataFrame, chunk_rows: int = 10_000) -> Iterator[bytes]:
+    """
+    Serialize DataFrame to JSON in row chunks for streaming export.
+    
+    The concatenated chunks are byte-for-byte the UTF-8 encoding of
+    export_to_json, but only chunk_rows rows are held as text at a time.
+    
+    Args:
+        df: DataFrame to export
+        chunk_rows: Rows serialized per chunk
+    
+    Returns:
+        Iterator of UTF-8 encoded JSON fragments
+    """
+    if df.empty:
+        yield df.to_json(orient='records', indent=2).encode('utf-8')
+        return
+    
+    yield b'[\n'
+    for start in range(0, len(df), chunk_rows):
+        # Each slice is a complete array; keep only its records
+        records = df.iloc[start:start + chunk_rows].to_json(orient='records', indent=2)[2:-2]
+        yield (b',\n' if start else b'') + records.encode('utf-8')
+    yield b'\n]'
+
+@st.cache_data(show_spinner=False)
+def export_to_csv(df: pd.DataFrame) -> bytes:
+    """
+    Convert DataFrame to CSV bytes for a download button.
+    
+    Download buttons need their data on every rerun, so the encoded file is
+    cached on the DataFrame contents and only rebuilt when they change.
+    
+    Args:
+        df: DataFrame to export
+    
+    Returns:
+        UTF-8 encoded CSV without the index
+    """
+    return df.to_csv(index=False).encode('utf-8')
+
 def create_heatmap(df: pd.DataFrame, 
                    x_column: str,
                    y_column: str,
                    value_column: str,
-                   title: str = "Risk Heatmap") -> go.Figure:
+                   title: str = "Risk Heatmap") -> "go.Figure":
     """
     Create a heatmap visualization.
     
@@ -271,12 +412,23 @@ def create_heatmap(df: pd.DataFrame,
     Returns:
         Plotly figure object
     """
-    pivot_df = df.pivot_table(
-        values=value_column,
-        index=y_column,
-        columns=x_column,
-        aggfunc='mean'
-    )
+    import plotly.graph_objects as go
+    
+    return go.Figure(_heatmap_dict(df, x_column, y_column, value_column, title))
+
+@st.cache_data(ttl=3600, max_entries=128, show_spinner=False)
+def _heatmap_dict(df: pd.DataFrame, x_column: str, y_column: str,
+                  value_column: str, title: str) -> dict:
+    """Pivot and build the heatmap figure; cached on the DataFrame contents and columns"""
+    import plotly.express as px
+    
+    if (len(df) > HEATMAP_BIN_ROWS
+            and pd.api.types.is_numeric_dtype(df[x_column])
+            and pd.api.types.is_numeric_dtype(df[y_column])):
+        pivot_df = _binned_mean_grid(df[x_column], df[y_column], df[value_column])
+    else:
+        # observed=True keeps categorical axes to the combinations present in the data
+        pivot_df = df.groupby([y_column, x_column], observed=True)[value_column].mean().unstack(x_column)
     
     fig = px.imshow(
         pivot_df,
@@ -285,7 +437,33 @@ def create_heatmap(df: pd.DataFrame,
         color_continuous_scale='RdYlGn_r'
     )
     
-    return fig
+    return fig.to_dict()
+
+def _axis_bins(values: np.ndarray) -> tuple:
+    """Equal-width bin index per value plus the bin centres, over at most HEATMAP_BINS bins"""
+    edges = np.linspace(np.nanmin(values), np.nanmax(values), HEATMAP_BINS + 1)
+    # The max lands past the last edge; fold it into the final bin
+    codes = np.clip(np.digitize(values, edges) - 1, 0, HEATMAP_BINS - 1)
+    return codes, (edges[:-1] + edges[1:]) / 2
+
+def _binned_mean_grid(x: pd.Series, y: pd.Series, values: pd.Series) -> pd.DataFrame:
+    """Mean of values over a HEATMAP_BINS x HEATMAP_BINS grid of the x and y axes, labelled by bin centre"""
+    x_arr = x.to_numpy(dtype=float, na_value=np.nan)
+    y_arr = y.to_numpy(dtype=float, na_value=np.nan)
+    v_arr = values.to_numpy(dtype=float, na_value=np.nan)
+    keep = ~(np.isnan(x_arr) | np.isnan(y_arr) | np.isnan(v_arr))
+    x_codes, x_centres = _axis_bins(x_arr[keep])
+    y_codes, y_centres = _axis_bins(y_arr[keep])
+    
+    cells = y_codes * HEATMAP_BINS + x_codes
+    sums = np.bincount(cells, weights=v_arr[keep], minlength=HEATMAP_BINS * HEATMAP_BINS)
+    counts = np.bincount(cells, minlength=HEATMAP_BINS * HEATMAP_BINS)
+    with np.errstate(invalid='ignore'):
+        grid = (sums / counts).reshape(HEATMAP_BINS, HEATMAP_BINS)
+    
+    return pd.DataFrame(grid,
+                        index=pd.Index(y_centres, name=y.name),
+                        columns=pd.Index(x_centres, name=x.name))
 
 def validate_data_quality(df: pd.DataFrame) -> Dict[str, Any]:
     """
@@ -297,13 +475,17 @@ def validate_data_quality(df: pd.DataFrame) -> Dict[str, Any]:
     Returns:
         Dictionary with quality metrics
     """
+    # One null mask serves every missing-value metric
+    missing_per_column = df.isna().to_numpy().sum(axis=0)
+    missing_values = missing_per_column.sum()
+    
     metrics = {
         'total_rows': len(df),
         'total_columns': len(df.columns),
-        'missing_values': df.isnull().sum().sum(),
+        'missing_values': missing_values,
         'duplicate_rows': df.duplicated().sum(),
-        'completeness_pct': ((df.size - df.isnull().sum().sum()) / df.size * 100),
-        'columns_with_missing': df.columns[df.isnull().any()].tolist()
+        'completeness_pct': ((df.size - missing_values) / df.size * 100),
+        'columns_with_missing': df.columns[missing_per_column > 0].tolist()
     }
     
     return metrics
@@ -321,6 +503,19 @@ def format_timestamp(timestamp: pd.Timestamp, format: str = '%Y-%m-%d %H:%M:%S')
     """
     return timestamp.strftime(format)
 
+def scalar(df: pd.DataFrame, col: str) -> Any:
+    """
+    Read the first value of a column without materializing it as an array.
+    
+    Args:
+        df: Non-empty DataFrame
+        col: Column name
+    
+    Returns:
+        Value in the first row of the column
+    """
+    return df[col].iat[0]
+
 def create_metric_card(title: str, value: str, delta: Optional[str] = None,
                       delta_color: str = "normal") -> None:
     """
@@ -342,6 +537,9 @@ RISK_COLORS = {
     'LOW': '#2ca02c'
 }
 
+# Risk categories from most to least severe
+RISK_CATEGORY_ORDER = ['CRITICAL', 'HIGH', 'MEDIUM', 'LOW']
+
 # Status colors
 STATUS_COLORS = {
     'PASSED': '#2ca02c',
@@ -351,10 +549,25 @@ STATUS_COLORS = {
     'INACTIVE': '#7f7f7f'
 }
 
+# Lookups keyed by both upper and lower case, so the common spellings skip .upper()
+_RISK_COLORS_CI = {**RISK_COLORS, **{k.lower(): v for k, v in RISK_COLORS.items()}}
+_STATUS_COLORS_CI = {**STATUS_COLORS, **{k.lower(): v for k, v in STATUS_COLORS.items()}}
+
 def get_risk_color(category: str) -> str:
     """Get color code for risk category."""
-    return RISK_COLORS.get(category.upper(), '#666666')
+    color = _RISK_COLORS_CI.get(category)
+    return color if color is not None else RISK_COLORS.get(category.upper(), '#666666')
 
 def get_status_color(status: str) -> str:
     """Get color code for status."""
-    return STATUS_COLORS.get(status.upper(), '#666666')
+    color = _STATUS_COLORS_CI.get(status)
+    return color if color is not None else STATUS_COLORS.get(status.upper(), '#666666')
+
+def get_risk_colors(categories: pd.Series) -> np.ndarray:
+    """Get color codes for a column of risk categories in one vectorized lookup."""
+    colors = categories.map(_RISK_COLORS_CI)
+    # Mixed-case spellings miss the table; retry them upper-cased like get_risk_color
+    missing = colors.isna() & categories.notna()
+    if missing.any():
+        colors[missing] = categories[missing].astype(str).str.upper().map(RISK_COLORS)
+    return colors.fillna('#666666').to_numpy(dtype=object)
@@ -187,7 +187,8 @@ CREATE OR REPLACE TABLE privacy_compliance_log (
     details VARCHAR(1000),
     checked_at TIMESTAMP_NTZ DEFAULT CURRENT_TIMESTAMP(),
     CONSTRAINT pk_compliance PRIMARY KEY (compliance_id)
-);
+)
+CLUSTER BY (checked_at);                        -- Prunes partitions for recent-activity reads
 
 -- ============================================================================
 -- AI_INSIGHTS SCHEMA - Cortex-generated content
@@ -6,7 +6,8 @@
  * Schema/Objects:
  * - Dynamic tables: dt_realtime_risk_aggregation, dt_age_group_stats,
  *   dt_regional_metrics, dt_occupation_risk_profile, dt_high_risk_tracker,
- *   dt_fraud_correlation, dt_daily_summary, dt_trend_comparison
+ *   dt_fraud_correlation, dt_daily_summary, dt_trend_comparison,
+ *   AI_INSIGHTS.latest_ai_summary
  * - TARGET_LAG ranges from 5 minutes to 1 hour
  * 
  * Dependencies:
@@ -289,4 +290,26 @@ SELECT
 FROM dt_realtime_risk_aggregation
 GROUP BY age_group, region;
 
+-- ============================================================================
+-- LATEST AI SUMMARY DYNAMIC TABLE
+-- ============================================================================
+
+-- Keeps only the newest cached summary per question so the dashboard reads
+-- one row by key instead of sorting the cache on every load
+CREATE OR REPLACE DYNAMIC TABLE AI_INSIGHTS.latest_ai_summary
+    TARGET_LAG = '5 minutes'
+    WAREHOUSE = CROSSRISK_ANALYTICS_WH
+    COMMENT = 'Most recent AI summary for each approved question'
+AS
+SELECT 
+    question_id,
+    ai_summary,
+    last_refreshed
+FROM AI_INSIGHTS.approved_questions_cache
+QUALIFY ROW_NUMBER() OVER (PARTITION BY question_id ORDER BY last_refreshed DESC) = 1;
+
+-- Same audience as the underlying cache (see governance/access_policies.sql)
+GRANT SELECT ON DYNAMIC TABLE AI_INSIGHTS.latest_ai_summary TO ROLE ANALYST_JUNIOR;
+GRANT SELECT ON DYNAMIC TABLE AI_INSIGHTS.latest_ai_summary TO ROLE VIEWER;
+
 SELECT 'Dynamic tables created successfully! They will refresh automatically based on TARGET_LAG settings.' AS status;